@@ -0,0 +1,135 @@
+"""Images of the views, loaded on first use and converted to the display format.
+
+Nothing is read from disk on import, so the window opens before the images
+are decoded, and images loaded after ``pygame.display.set_mode`` are
+converted to the format of the display once instead of on every blit. The
+small sprites are scaled to the size they are drawn at and packed into one
+atlas. Scaled images and the atlas are cached on disk, the next start loads
+them as they are.
+"""
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+import pygame as pg
+
+from photocell.tables import cache_root
+
+main_dir = os.path.split(os.path.abspath(__file__))[0]
+img_dir = os.path.join(main_dir, 'img')
+
+# sprites packed into the atlas, with the size they are drawn at
+atlas_images = (
+    ("electron.png", (10, 10)),
+    ("slider_cursor.png", (8, 64)),
+    ("scale_line.png", (350, 50)),
+)
+
+
+class Assets:
+    def __init__(self, img_dir: str = img_dir, cache_dir: Optional[str] = os.path.join(cache_root, "assets")) -> None:
+        self.img_dir = img_dir
+        self.cache_dir = cache_dir
+        # (file name, size) -> (surface, converted to the display format)
+        self.images = {}
+        self.atlas = None
+
+    def image(self, name: str, size: Optional[Tuple[int, int]] = None) -> pg.Surface:
+        key = (name, size)
+        display = pg.display.get_surface() is not None
+        try:
+            surface, converted = self.images[key]
+        except KeyError:
+            surface, converted = None, False
+        if surface is not None and (converted or not display):
+            return surface
+
+        if key in atlas_images:
+            # a subsurface of the atlas, which is converted as a whole
+            surface = self.load_atlas().subsurface(_atlas_rects()[key])
+        else:
+            if surface is None:
+                surface = self.load(name, size)
+            if display:
+                surface = _convert(surface)
+        self.images[key] = surface, display
+        return surface
+
+    def load(self, name: str, size: Optional[Tuple[int, int]] = None) -> pg.Surface:
+        if size is None:
+            return pg.image.load(os.path.join(self.img_dir, name))
+        return self.cached(f"{os.path.splitext(name)[0]}_{size[0]}x{size[1]}", ((name, size),), lambda: pg.transform.scale(pg.image.load(os.path.join(self.img_dir, name)), size))
+
+    def load_atlas(self) -> pg.Surface:
+        if self.atlas is None or (not self.atlas[1] and pg.display.get_surface() is not None):
+            atlas = self.cached("atlas", atlas_images, self.build_atlas)
+            if pg.display.get_surface() is not None:
+                self.atlas = _convert(atlas), True
+            else:
+                self.atlas = atlas, False
+        return self.atlas[0]
+
+    def build_atlas(self) -> pg.Surface:
+        rects = _atlas_rects()
+        width = max(r.right for r in rects.values())
+        height = max(r.bottom for r in rects.values())
+        atlas = pg.Surface((width, height), pg.SRCALPHA)
+        atlas.fill((0, 0, 0, 0))
+        for (name, size), rect in rects.items():
+            image = pg.transform.scale(pg.image.load(os.path.join(self.img_dir, name)), size)
+            # copied, not blended over the transparent atlas
+            atlas.blit(image, rect, special_flags=pg.BLEND_RGBA_MAX)
+        return atlas
+
+    def cached(self, stem: str, sources, build) -> pg.Surface:
+        path = None
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, f"{stem}_{self.version(sources)}.png")
+            try:
+                return pg.image.load(path)
+            except (OSError, pg.error):
+                pass
+
+        surface = build()
+        if path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                pg.image.save(surface, path)
+            except (OSError, pg.error):
+                pass
+        return surface
+
+    def version(self, sources) -> str:
+        digest = hashlib.sha1()
+        for name, size in sources:
+            stat = os.stat(os.path.join(self.img_dir, name))
+            digest.update(f"{name}|{size}|{stat.st_size}|{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()[:12]
+
+
+def _atlas_rects() -> Dict[Tuple[str, Tuple[int, int]], pg.Rect]:
+    rects = {}
+    x = 0
+    for name, size in atlas_images:
+        rects[name, size] = pg.Rect((x, 0), size)
+        x += size[0] + 1
+    return rects
+
+
+def _convert(surface: pg.Surface) -> pg.Surface:
+    if surface.get_flags() & pg.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+
+class Image:
+    """Class attribute holding an image of ``assets``, loaded on first access."""
+    def __init__(self, name: str, size: Optional[Tuple[int, int]] = None) -> None:
+        self.name = name
+        self.size = size
+
+    def __get__(self, instance, owner) -> pg.Surface:
+        return assets.image(self.name, self.size)
+
+
+assets = Assets()
@@ -0,0 +1,364 @@
+"""Benchmarks of the physics, the drawing code and the whole frame loop.
+
+Runs headless with SDL_VIDEODRIVER=dummy::
+
+    python bench.py run -o baseline.json
+    python bench.py run -o current.json
+    python bench.py compare baseline.json current.json --threshold 0.1
+
+``compare`` exits with status 1 when a benchmark got slower than the baseline
+by more than the threshold.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pygame as pg
+
+pg.init()
+screen = pg.display.set_mode((1000, 800))
+
+import sprites
+from photocell.core import Electrons, Simulation, launch_x, launch_y
+from photocell.emission import EmissionSampler
+from photocell.field import FieldElectrons
+from photocell.light import mercury_lamp
+from photocell.trajectory import AnalyticElectrons
+
+timedelta = 2e-5 / 60
+benchmarks = {}
+
+
+def benchmark(name: str, number: int = 100) -> Callable:
+    """Registers a setup function, which returns the callable to time."""
+    def register(setup: Callable[[], Callable[[], None]]) -> Callable:
+        benchmarks[name] = (setup, number)
+        return setup
+    return register
+
+
+def _filled(electrons, count: int = 10000):
+    rng = np.random.default_rng(0)
+    electrons.spawn(rng.uniform(1e5, 1e6, count), rng.integers(*launch_y, count), launch_x + rng.integers(0, 400, count))
+    return electrons
+
+
+def _scene(**kwargs):
+    photocell = sprites.Photocell(simulation=Simulation(seed=0, electrons=AnalyticElectrons(), **kwargs))
+    settings = sprites.Settings(photocell)
+    electron_group = sprites.ElectronSwarm(photocell.electrons)
+    renderer = sprites.DirtyRenderer(screen, photocell, settings, electron_group)
+    renderer.full_redraw()
+
+    def frame():
+        photocell.update(timedelta)
+        photocell.render_current()
+        photocell.render_voltage()
+        settings.render_chart()
+        pg.display.update(renderer.draw())
+
+    # let the electrons fill the space before timing
+    for i in range(300):
+        frame()
+    return photocell, settings, frame
+
+
+@benchmark("physics.euler_step_10k")
+def _():
+    electrons = _filled(Electrons())
+    return lambda: electrons.step(timedelta, 5.05e-3)
+
+
+@benchmark("physics.analytic_step_10k")
+def _():
+    electrons = _filled(AnalyticElectrons())
+    return lambda: electrons.step(timedelta, 5.05e-3)
+
+
+@benchmark("physics.field_step_10k")
+def _():
+    electrons = _filled(FieldElectrons())
+    return lambda: electrons.step(timedelta, 5.05e-3)
+
+
+@benchmark("physics.simulation_step_max_intensity", number=1000)
+def _():
+    simulation = Simulation(5e19, 280, 5.05e-3, "Cs", seed=0, electrons=AnalyticElectrons())
+    return lambda: simulation.step(timedelta)
+
+
+@benchmark("physics.emission_sample_1k", number=1000)
+def _():
+    sampler = EmissionSampler(0)
+    return lambda: sampler.sample(1000, 1e6, launch_y)
+
+
+@benchmark("physics.spectrum_sample_1k", number=1000)
+def _():
+    spectrum = mercury_lamp()
+    rng = np.random.default_rng(0)
+    return lambda: spectrum.kinetic_energy(rng, 1000, 0.31e-18)
+
+
+@benchmark("physics.simulation_step_mercury_lamp", number=1000)
+def _():
+    simulation = Simulation(5e19, 280, 5.05e-3, "Cs", seed=0, electrons=AnalyticElectrons(), spectrum=mercury_lamp())
+    return lambda: simulation.step(timedelta)
+
+
+@benchmark("render.render_photocell_miss", number=20)
+def _():
+    photocell = sprites.Photocell()
+    wave_lengths = iter(range(280, 750))
+
+    def render():
+        photocell.backgrounds.clear()
+        photocell.wave_length = next(wave_lengths)
+        photocell.render_photocell()
+    return render
+
+
+@benchmark("render.render_photocell_hit", number=1000)
+def _():
+    photocell = sprites.Photocell()
+    return photocell.render_photocell
+
+
+@benchmark("render.readouts_changing", number=1000)
+def _():
+    photocell = sprites.Photocell()
+    values = iter(np.linspace(0, 4, 100000))
+
+    def render():
+        photocell.simulation.current = next(values)
+        photocell.render_current()
+        photocell.render_voltage()
+    return render
+
+
+@benchmark("render.electron_draw_10k")
+def _():
+    electron_group = sprites.ElectronSwarm(_filled(Electrons()))
+    surface = pg.Surface((1000, 450))
+    return lambda: electron_group.draw(surface)
+
+
+@benchmark("render.electron_pixels_10k")
+def _():
+    electron_group = sprites.PixelSwarm(_filled(Electrons()), "pixels")
+    surface = pg.Surface((1000, 450))
+    return lambda: electron_group.draw(surface)
+
+
+@benchmark("render.electron_density_100k")
+def _():
+    electron_group = sprites.PixelSwarm(_filled(Electrons(), 100000), "density")
+    surface = pg.Surface((1000, 450))
+    return lambda: electron_group.draw(surface)
+
+
+@benchmark("render.current_chart", number=1000)
+def _():
+    photocell = sprites.Photocell()
+    settings = sprites.Settings(photocell)
+    # real electrons reaching the anode per frame, a drawn one now and then
+    arrivals = iter((np.random.default_rng(0).poisson(0.05, 100000) * 5e14).tolist())
+
+    def render():
+        photocell.simulation.time += timedelta
+        photocell.simulation.collected += next(arrivals)
+        settings.render_chart()
+        settings.dirty_rects = []
+    return render
+
+
+@benchmark("input.slider_drag", number=1000)
+def _():
+    settings = sprites.Settings(sprites.Photocell())
+    # wavelength slider cursor, see LightSettings.arrange
+    settings.handle_input((650, 639), 'mousestart')
+    positions = iter(np.tile(np.r_[np.arange(480, 820), np.arange(820, 480, -1)], 100).tolist())
+
+    def drag():
+        settings.handle_input((next(positions), 639), 'mousepos')
+        settings.dirty_rects = []
+    return drag
+
+
+@benchmark("scenario.idle", number=300)
+def _():
+    return _scene()[2]
+
+
+@benchmark("scenario.max_intensity_short_wavelength", number=300)
+def _():
+    return _scene(light_performance=5e19, wave_length=280, catode_mat="Cs")[2]
+
+
+@benchmark("scenario.slider_drag", number=300)
+def _():
+    photocell, settings, frame = _scene(catode_mat="Cs")
+    settings.handle_input((650, 639), 'mousestart')
+    positions = iter(np.tile(np.r_[np.arange(480, 820), np.arange(820, 480, -1)], 100).tolist())
+
+    def drag():
+        settings.handle_input((next(positions), 639), 'mousepos')
+        frame()
+    return drag
+
+
+@benchmark("scenario.material_switching", number=300)
+def _():
+    photocell, settings, frame = _scene(wave_length=300)
+    selector = settings.canvas.states["catode"]
+    buttons = selector.buttons.sprites()
+    count = iter(range(10**9))
+
+    def switch():
+        selector.change_active(buttons[next(count) % len(buttons)])
+        settings.canvas.refresh()
+        settings.refresh_settings()
+        frame()
+    return switch
+
+
+@benchmark("main.frame_loop", number=300)
+def _():
+    import main
+
+    class Done(Exception):
+        pass
+
+    def run():
+        frames = 0
+        update = pg.display.update
+
+        def counted(*args, **kwargs):
+            nonlocal frames
+            frames += 1
+            if frames > benchmarks["main.frame_loop"][1]:
+                raise Done
+            return update(*args, **kwargs)
+
+        pg.display.update = counted
+        # main sets its own display mode
+        pg.display.quit()
+        try:
+            main.main(["--max-fps", "0", "--seed", "0"])
+        except Done:
+            pass
+        finally:
+            pg.display.update = update
+    # one call runs the whole loop, the result is divided by the frame count
+    run.frames = benchmarks["main.frame_loop"][1]
+    return run
+
+
+@benchmark("main.first_frame", number=1)
+def _():
+    # a fresh interpreter, so imports and image loading count
+    import subprocess
+
+    def run():
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), "--frames", "0"], check=True)
+    return run
+
+
+def measure(setup: Callable, number: int, repeat: int) -> Dict[str, float]:
+    fn = setup()
+    frames = getattr(fn, "frames", None)
+    if frames:
+        number, per_call = 1, frames
+    else:
+        per_call = 1
+
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        for j in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / (number * per_call))
+    return {"median": statistics.median(times), "min": min(times), "number": number * per_call, "repeat": repeat}
+
+
+def run(names: Sequence[str], repeat: int) -> dict:
+    results = {}
+    for name in names:
+        setup, number = benchmarks[name]
+        results[name] = measure(setup, number, repeat)
+        print(f"{name:45} {results[name]['median']*1e6:12.1f} us")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pg.version.ver,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Prints both results side by side, returns whether none regressed."""
+    ok = True
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:45} {'':>12} {result['median']*1e6:12.1f} us  new")
+            continue
+        ratio = result["median"] / base["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            ok = False
+        elif ratio < 1 - threshold:
+            flag = "faster"
+        print(f"{name:45} {base['median']*1e6:12.1f} {result['median']*1e6:12.1f} us  {ratio:6.2f}x  {flag}")
+    return ok
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks of the photocell simulation.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    run_parser.add_argument("-o", "--output", default=None)
+    run_parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    run_parser.add_argument("--repeat", type=int, default=5)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, 0.1 is 10%%")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        names = [name for name in benchmarks if args.filter in name]
+        results = run(names, args.repeat)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        if not compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
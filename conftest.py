@@ -0,0 +1 @@
+# the tests import photocell from the checkout, pytest puts the directory of this file on the path
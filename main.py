@@ -1,6 +1,22 @@
+import time
+started = time.perf_counter()  # the time to the first frame includes the imports
+
 import pygame as pg
 import sprites
+from photocell.core import Simulation, materials
+from photocell.field import FieldElectrons
+from photocell.light import spectra
+from photocell.lod import LevelOfDetail
+from photocell.profiler import FrameProfiler, NullProfiler
+from photocell.replay import Recorder
+from photocell.scene import Scene
+from photocell.scheduler import Scheduler
+from photocell.telemetry import Telemetry
+from photocell.trajectory import AnalyticElectrons
+from photocell.worker import PhysicsWorker, SimulationProxy
+import argparse
 import os
+import random
 import sys
 
 
@@ -8,56 +24,250 @@ if getattr(sys, 'frozen', False):
     os.chdir(sys._MEIPASS)
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A simulation to show the essence of the photoelectric effect.")
+    parser.add_argument("--telemetry", metavar="PATH", help="spill every physics step to a raw telemetry file")
+    parser.add_argument("--telemetry-shared", action="store_true", help="keep the telemetry ring in shared memory and print its name")
+    parser.add_argument("--record", metavar="PATH", help="record the input and physics steps for photocell.replay")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the emission sampler")
+    parser.add_argument("--max-fps", type=float, default=60, help="frame cap, 0 renders as fast as possible")
+    parser.add_argument("--profile", action="store_true", help="time the phases of every frame, F3 shows them, F4 saves a Chrome trace")
+    parser.add_argument("--trace", metavar="PATH", default="photocell-trace.json", help="where F4 saves the trace")
+    parser.add_argument("--threaded", action="store_true", help="run the physics on a worker thread")
+    parser.add_argument("--field", action="store_true", help="move the electrons through the solved field of the electrodes instead of a uniform one")
+    parser.add_argument("--light", choices=sorted(spectra), default=None, help="light the catode with the spectrum of a lamp instead of one wavelength, the wavelength slider switches back")
+    parser.add_argument("--electrons", choices=("blits",) + sprites.PixelSwarm.modes, default="blits", help="draw the electrons as sprites or into the pixels with numpy, density shades by electron count")
+    parser.add_argument("--frames", type=int, default=None, help="quit after this many frames, for timing runs")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="view the simulation of a photocell.server instead of running one")
+    parser.add_argument("--compare", nargs="+", metavar="MAT[:NM[:MV]]", help="show several photocells side by side, e.g. Cs:400:5 K:400:5 Al:280:5")
+    args = parser.parse_args(argv)
+    if (args.threaded or args.connect) and args.record:
+        parser.error("--record needs the physics on the main thread, it can not be used with --threaded or --connect")
+    if args.field and args.record:
+        parser.error("replays use the uniform field, --record can not be used with --field")
+    if args.light and (args.record or args.connect):
+        parser.error("replays and servers use a single wavelength, --light can not be used with --record or --connect")
+    if args.compare:
+        try:
+            args.compare = [compare_spec(spec) for spec in args.compare]
+        except ValueError as error:
+            parser.error(f"--compare: {error}")
+
+    seed = args.seed
+    if seed is None:
+        seed = random.randrange(2**62)
+
     fps = 60
     timescale = 2e-5
     pg.init()
-    clock = pg.time.Clock()
+    scheduler = Scheduler(physics_rate=fps, timescale=timescale, max_fps=args.max_fps)
 
     screen = pg.display.set_mode((1000, 800), pg.SCALED)
     screen.fill((255, 255, 255))
+    pg.display.set_caption("photocell")
+
+    if args.compare:
+        compare(screen, scheduler, args.compare, seed, args.frames)
+        pg.quit()
+        return
 
-    photocell = sprites.Photocell()
-    screen.blit(photocell.image, photocell.rect)
+    telemetry = Telemetry(spill_path=args.telemetry, shared=args.telemetry_shared)
+    if telemetry.name:
+        print(f"telemetry shared memory: {telemetry.name}")
 
+    spectrum = spectra[args.light]() if args.light else None
+    simulation = Simulation(seed=seed, electrons=FieldElectrons() if args.field else AnalyticElectrons(), spectrum=spectrum)
+    worker = None
+    if args.threaded:
+        worker = PhysicsWorker(simulation, scheduler, on_step=telemetry.record)
+        simulation = SimulationProxy(worker)
+    elif args.connect:
+        # asyncio is only imported by the server side, not on every start
+        from photocell.server import Connection
+        host, _, port = args.connect.rpartition(":")
+        worker = Connection(host or "localhost", int(port))
+        simulation = SimulationProxy(worker)
+
+    photocell = sprites.Photocell(simulation=simulation)
     settings = sprites.Settings(photocell)
-    screen.blit(settings.image, settings.rect)
+    if args.electrons == "blits":
+        electron_group = sprites.ElectronSwarm(photocell.electrons)
+    else:
+        electron_group = sprites.PixelSwarm(photocell.electrons, args.electrons)
+
+    # the ratio of a served simulation is shared, one viewer's frame time must not set it
+    level_of_detail = None if args.connect else LevelOfDetail(photocell.simulation)
+
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record, seed, scheduler.timedelta, analytic=True)
 
-    electron_group = pg.sprite.Group()
+    def handle_input(pos, type):
+        if recorder:
+            recorder.input(type, pos)
+        settings.handle_input(pos, type)
 
-    run = True
+    def step(timedelta):
+        photocell.update(timedelta)
+        telemetry.record(photocell.simulation)
+
+    profiler = FrameProfiler() if args.profile else NullProfiler()
+    overlay = sprites.ProfilerOverlay()
+    show_overlay = False
+
+    renderer = sprites.DirtyRenderer(screen, photocell, settings, electron_group)
+    pg.display.update(renderer.full_redraw())
+    first_frame = time.perf_counter() - started
+    if args.profile:
+        print(f"first frame after {first_frame * 1000:.0f} ms")
+
+    run = args.frames != 0
+    frames = 0
     tracking_mouse = False
+    motion = None
+    if worker:
+        worker.start()
 
     while run:    
-        for event in pg.event.get():
-            if event.type == pg.QUIT:
-                pg.quit()
-            if event.type == pg.MOUSEBUTTONDOWN:
-                settings.handle_input(event.pos, 'mousestart')
-                tracking_mouse = True
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
+        with profiler.span("events"):
+            for event in pg.event.get():
+                if event.type == pg.QUIT:
+                    run = False
+                if event.type == pg.MOUSEBUTTONDOWN:
+                    handle_input(event.pos, 'mousestart')
+                    tracking_mouse = True
+                    motion = None
 
-            if event.type == pg.MOUSEBUTTONUP:
-                settings.handle_input(event.pos, 'mousestop')
-                tracking_mouse = False
+                # a drag only needs the latest position of the frame
+                if event.type == pg.MOUSEMOTION and tracking_mouse:
+                    motion = event.pos
 
-        if tracking_mouse:
-            settings.handle_input(pg.mouse.get_pos(), 'mousepos')
+                if event.type == pg.MOUSEBUTTONUP:
+                    handle_input(event.pos, 'mousestop')
+                    tracking_mouse = False
+                    motion = None
 
-        electrons = photocell.update((1/fps)*timescale)
-        electron_group.update((1/fps)*timescale, photocell.voltage)
-        electron_group.add(*electrons)
-        
-        photocell.render_current()
-        photocell.render_voltage()
-        screen.blit(photocell.image, photocell.rect)
-        electron_group.draw(screen)
+                if event.type == pg.KEYDOWN:
+                    if event.key in (pg.K_PLUS, pg.K_EQUALS, pg.K_KP_PLUS):
+                        scheduler.speed_up()
+                    elif event.key in (pg.K_MINUS, pg.K_KP_MINUS):
+                        scheduler.slow_down()
+                    elif event.key in (pg.K_0, pg.K_KP0):
+                        scheduler.time_acceleration = 1.0
+                    elif event.key == pg.K_l and level_of_detail:
+                        level_of_detail.enabled = not level_of_detail.enabled
+                    elif event.key == pg.K_F3 and profiler.enabled:
+                        show_overlay = not show_overlay
+                        if not show_overlay:
+                            photocell.dirty_rects.append(overlay.rect.copy())
+                    elif event.key == pg.K_F4 and profiler.enabled:
+                        profiler.export(args.trace)
+                        print(f"trace saved to {args.trace}")
+                    pg.display.set_caption(f"photocell x{scheduler.time_acceleration:g}")
+
+            if motion is not None:
+                handle_input(motion, 'mousepos')
+                motion = None
 
-        screen.blit(settings.image, settings.rect)        
+        steps = 0
+        if worker is None:
+            with profiler.span("physics"):
+                steps = scheduler.substeps()
+                if recorder:
+                    recorder.frame(photocell.simulation, steps)
+                for i in range(steps):
+                    step(scheduler.timedelta)
+        elif args.connect and photocell.simulation.sync():
+            # another viewer changed the shared simulation
+            photocell.render_photocell()
+            settings.show()
         
+        with profiler.span("readouts"):
+            photocell.render_current()
+            photocell.render_voltage()
+            settings.render_chart()
+
+        with profiler.span("draw"):
+            dirty = renderer.draw()
+            if show_overlay:
+                overlay.render(profiler)
+                screen.blit(overlay.image, overlay.rect)
+                dirty.append(overlay.rect)
+
+        with profiler.span("display"):
+            pg.display.update(dirty)
+
+        if level_of_detail:
+            level_of_detail.update(time.perf_counter() - frame_start)
+        profiler.end_frame(electrons=len(electron_group), substeps=steps)
+        scheduler.pace()
+
+        frames += 1
+        if frames == args.frames:
+            run = False
+
+    if worker:
+        worker.stop()
+    if recorder:
+        recorder.close(photocell.simulation)
+    telemetry.close()
+    pg.quit()
+
+
+def compare_spec(spec):
+    material, *values = spec.split(":")
+    if material not in materials:
+        raise ValueError(f"unknown material {material!r} in {spec!r}, one of {', '.join(materials)}")
+    if len(values) > 2:
+        raise ValueError(f"{spec!r} is not MAT[:NM[:MV]]")
+    values += ["515", "5.05"][len(values):]
+    try:
+        wave_length, voltage = int(values[0]), float(values[1])
+    except ValueError:
+        raise ValueError(f"{spec!r} is not MAT[:NM[:MV]], the wavelength is whole nm and the voltage mV") from None
+    # the ranges of the sliders
+    if not 280 <= wave_length <= 750:
+        raise ValueError(f"the wavelength of {spec!r} is not within 280-750 nm")
+    if not 0.1 <= voltage <= 10:
+        raise ValueError(f"the voltage of {spec!r} is not within 0.1-10 mV")
+    return material, wave_length, voltage
+
+
+def compare(screen, scheduler, specs, seed, frames=None):
+    simulations = []
+    for i, (material, wave_length, voltage) in enumerate(specs):
+        simulations.append(Simulation(wave_length=wave_length, voltage=voltage*1e-3, catode_mat=material, seed=seed + i))
+    scene = Scene(simulations)
+    view = sprites.ComparisonView(scene, screen.get_size())
+
+    run = frames != 0
+    frame = 0
+    while run:
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                run = False
+            if event.type == pg.KEYDOWN:
+                if event.key in (pg.K_PLUS, pg.K_EQUALS, pg.K_KP_PLUS):
+                    scheduler.speed_up()
+                elif event.key in (pg.K_MINUS, pg.K_KP_MINUS):
+                    scheduler.slow_down()
+                elif event.key in (pg.K_0, pg.K_KP0):
+                    scheduler.time_acceleration = 1.0
+                pg.display.set_caption(f"photocell x{scheduler.time_acceleration:g}")
+
+        scheduler.run(scene.step)
+
+        screen.fill((255, 255, 255))
+        view.draw(screen)
         pg.display.flip()
+        scheduler.pace()
 
-    clock.tick(fps)
+        frame += 1
+        if frame == frames:
+            run = False
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,4 @@
+"""Headless photoelectric effect simulation, independent of pygame."""
+from .core import Electrons, Simulation
+
+__all__ = ["Electrons", "Simulation"]
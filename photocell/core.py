@@ -0,0 +1,222 @@
+"""Pure model of the photocell, usable without pygame or a display.
+
+Lengths are in the pixel coordinates of the window drawn by ``sprites``, so a
+pygame view can draw the electron state directly.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .emission import EmissionSampler
+from .light import Spectrum
+from .tables import electron_mass, elementary_charge, lookup_tables, materials, max_wavelength_of_materials, photon_energy, work_function_of_materials
+
+electrons_per_display = 5e14  # default number of real electrons behind one drawn electron
+
+# 233, 121 -- topleft
+# 740, 218 -- bottomright
+space_between_electrodes = (233, 121, 497, 100)  # left, top, width, height
+electron_size = (10, 10)
+launch_x = 234
+launch_y = (121, 211)
+electrode_distance = 0.1  # in m
+
+
+def field_acceleration(voltage: float) -> float:
+    e_field_strength = voltage / electrode_distance
+    electric_force = e_field_strength * elementary_charge
+    return electric_force / electron_mass
+
+
+class Electrons:
+    """Electrons in flight as structure-of-arrays buffers.
+
+    Freed slots are reused by later spawns, the buffers only grow when full.
+    """
+    def __init__(self, space: Tuple[int, int, int, int] = space_between_electrodes, capacity: int = 4096) -> None:
+        self.space = tuple(space)
+        self.size = electron_size
+
+        self.x = np.zeros(capacity, dtype=np.int64)
+        self.y = np.zeros(capacity, dtype=np.int64)
+        self.delta_x = np.zeros(capacity, dtype=np.float64)
+        self.velocity = np.zeros(capacity, dtype=np.float64)
+        self.weight = np.zeros(capacity, dtype=np.float64)  # real electrons per slot
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.alive))
+
+    @property
+    def capacity(self) -> int:
+        return self.alive.size
+
+    def grow(self, capacity: int) -> None:
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        self.x = np.concatenate((self.x, np.zeros(extra, dtype=self.x.dtype)))
+        self.y = np.concatenate((self.y, np.zeros(extra, dtype=self.y.dtype)))
+        self.delta_x = np.concatenate((self.delta_x, np.zeros(extra, dtype=self.delta_x.dtype)))
+        self.velocity = np.concatenate((self.velocity, np.zeros(extra, dtype=self.velocity.dtype)))
+        self.weight = np.concatenate((self.weight, np.zeros(extra, dtype=self.weight.dtype)))
+        self.alive = np.concatenate((self.alive, np.zeros(extra, dtype=bool)))
+
+    def spawn(self, velocity: np.ndarray, y: np.ndarray, x=launch_x, weight=electrons_per_display) -> np.ndarray:
+        velocity = np.asarray(velocity, dtype=np.float64)
+        count = velocity.size
+        if not count:
+            return np.empty(0, dtype=np.intp)
+
+        free = np.flatnonzero(~self.alive)
+        if free.size < count:
+            self.grow(max(self.capacity * 2, self.capacity + count - free.size))
+            free = np.flatnonzero(~self.alive)
+        slots = free[:count]
+
+        self.x[slots] = x
+        self.y[slots] = y
+        self.delta_x[slots] = 0
+        self.velocity[slots] = velocity
+        self.weight[slots] = weight
+        self.alive[slots] = True
+        return slots
+
+    def clear(self) -> None:
+        self.alive[:] = False
+        self.velocity[:] = 0
+        self.delta_x[:] = 0
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        slots = np.flatnonzero(self.alive)
+        return self.x[slots], self.y[slots]
+
+    def step(self, timedelta: float, voltage: float) -> Tuple[float, float]:
+        """Advance every electron, returns the real electrons (collected, returned)."""
+        at_anode, at_catode = self.advance(timedelta, voltage)
+        return float(self.weight @ at_anode), float(self.weight @ at_catode)
+
+    def advance(self, timedelta: float, voltage) -> Tuple[np.ndarray, np.ndarray]:
+        """Advance every electron, returns the masks of the slots leaving at the anode and the catode.
+
+        ``voltage`` may also be an array with the voltage over every slot.
+        """
+        alive = self.alive
+
+        self.delta_x += self.velocity * timedelta
+        moved = self.delta_x.astype(np.int64)
+        self.x += moved
+        self.delta_x -= moved
+
+        w, h = self.size
+        left, top, width, height = self.space
+        at_anode = alive & (self.x >= left + width)
+        at_catode = alive & (self.x + w <= left)
+        alive &= (self.x + w > left) & (self.x < left + width)
+        alive &= (self.y + h > top) & (self.y < top + height)
+
+        self.velocity += field_acceleration(voltage) * timedelta
+        self.velocity *= alive
+        self.delta_x *= alive
+
+        return at_anode, at_catode
+
+
+class Simulation:
+    def __init__(self, light_performance: float = 2.5e19, wave_length: int = 515, voltage: float = 5.05e-3, catode_mat: str = "Al", seed: Optional[int] = None, electrons: Optional[Electrons] = None, sampler: Optional[EmissionSampler] = None, spectrum: Optional[Spectrum] = None) -> None:
+        self.catode_mat = catode_mat
+
+        self.light_performance = light_performance
+        self.wave_length = wave_length
+        self.voltage = voltage
+        self.spectrum = spectrum  # light of a lamp, None for the single wave_length
+
+        self.sampler = EmissionSampler(seed) if sampler is None else sampler
+        self.electrons = Electrons() if electrons is None else electrons
+
+        self.electrons_per_display = electrons_per_display
+
+        self.time = 0.0
+        self.current = 0
+        self.electron_count = 0
+        self.emitted = 0  # drawn electrons
+        self.collected = 0  # real electrons that reached the anode
+        self.returned = 0  # real electrons that fell back to the catode
+
+        # real electrons emitted and collected in the last step
+        self.step_emitted = 0
+        self.step_collected = 0
+        self.anode_current = 0
+
+    @property
+    def catode_mat(self) -> str:
+        return self._catode_mat
+
+    @catode_mat.setter
+    def catode_mat(self, material: str) -> None:
+        self._catode_mat = material
+        self.refresh_catode()
+
+    def refresh_catode(self) -> None:
+        self.material_index = materials.index(self.catode_mat)
+        self.work_function = work_function_of_materials[self.catode_mat]
+        self.max_wavelength = max_wavelength_of_materials[self.catode_mat]
+
+    def kinetic_energy(self) -> float:
+        """Maximal kinetic energy of the emitted electrons in J, 0 below the threshold."""
+        column = lookup_tables().column(self.wave_length)
+        if column is None:
+            return max(float(photon_energy(self.wave_length)) - self.work_function*1e-18, 0.0)
+        return float(lookup_tables().kinetic_energy[self.material_index, column])
+
+    def emission_speed(self) -> float:
+        column = lookup_tables().column(self.wave_length)
+        if column is None:
+            return float(np.sqrt(2 * self.kinetic_energy() / electron_mass))
+        return float(lookup_tables().emission_speed[self.material_index, column])
+
+    @property
+    def collected_charge(self) -> float:
+        return self.collected * elementary_charge
+
+    def emit(self, timedelta: float) -> int:
+        if self.spectrum is not None:
+            # only the photons below the threshold free an electron
+            electron_count = self.sampler.count(self.light_performance * timedelta * self.spectrum.fraction_below(self.max_wavelength))
+        elif self.wave_length < self.max_wavelength:
+            electron_count = self.sampler.count(self.light_performance * timedelta)
+        else:
+            electron_count = 0
+
+        self.current = (electron_count * elementary_charge) / timedelta
+        self.step_emitted = electron_count
+        self.electron_count += electron_count
+
+        # every drawn electron stands for electrons_per_display real ones, the
+        # remainder is carried over so no emitted charge is lost
+        electrons_to_display = int(self.electron_count/self.electrons_per_display)
+        if not electrons_to_display:
+            return 0
+
+        if self.spectrum is None:
+            velocity = self.emission_speed()
+        else:
+            # every electron gets the energy of its own photon
+            velocity = np.sqrt(2 * self.spectrum.kinetic_energy(self.sampler.rng, electrons_to_display, self.work_function*1e-18) / electron_mass)
+        velocities, heights = self.sampler.sample(electrons_to_display, velocity, launch_y)
+        self.electrons.spawn(velocities, heights, weight=self.electrons_per_display)
+        self.electron_count -= electrons_to_display * self.electrons_per_display
+        return electrons_to_display
+
+    def step(self, timedelta: float) -> int:
+        """Advance the simulation by ``timedelta`` seconds, returns the number of new electrons."""
+        collected, returned = self.electrons.step(timedelta, self.voltage)
+        self.collected += collected
+        self.returned += returned
+        self.step_collected = collected
+        self.anode_current = (collected * elementary_charge) / timedelta
+
+        emitted = self.emit(timedelta)
+        self.emitted += emitted
+        self.time += timedelta
+        return emitted
@@ -0,0 +1,65 @@
+"""Batched sampling of the emitted electrons with a seeded numpy Generator.
+
+One call draws the emission count of a step and the launch velocity and
+height of every drawn electron, ready for ``Electrons.spawn``. The default
+distributions reproduce the original model: every electron leaves with the
+maximal kinetic energy at a whole angle of 0-85 degrees. ``energy="parabolic"``
+and ``angle="lambert"`` give the more realistic spread of a real cathode.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+energy_distributions = ("max", "uniform", "parabolic")
+angle_distributions = ("degrees", "lambert")
+
+
+class EmissionSampler:
+    def __init__(self, seed: Optional[int] = None, poisson: bool = True, energy: str = "max", angle: str = "degrees", max_angle: float = 85) -> None:
+        if energy not in energy_distributions:
+            raise ValueError(f"unknown energy distribution {energy!r}, expected one of {energy_distributions}")
+        if angle not in angle_distributions:
+            raise ValueError(f"unknown angle distribution {angle!r}, expected one of {angle_distributions}")
+
+        self.rng = np.random.default_rng(seed)
+        self.poisson = poisson
+        self.energy = energy
+        self.angle = angle
+        self.max_angle = max_angle
+
+    def count(self, expected: float) -> float:
+        """Number of real electrons emitted when ``expected`` are expected on average."""
+        if expected <= 0:
+            return 0
+        if self.poisson:
+            return float(self.rng.poisson(expected))
+        return expected // 1
+
+    def energy_fraction(self, count: int) -> np.ndarray:
+        """Kinetic energy of each electron as a fraction of the maximal one."""
+        if self.energy == "max":
+            return np.ones(count)
+        if self.energy == "uniform":
+            return self.rng.random(count)
+        # p(E) ~ E*(E_max - E), zero at both ends
+        return self.rng.beta(2, 2, count)
+
+    def angles(self, count: int) -> np.ndarray:
+        """Launch angle of each electron to the normal of the catode, in radians."""
+        if self.angle == "degrees":
+            return np.radians(self.rng.integers(0, int(self.max_angle), count, endpoint=True))
+        # cosine law, the flux through the surface is proportional to cos(angle)
+        limit = np.sin(np.radians(self.max_angle))**2
+        return np.arcsin(np.sqrt(self.rng.random(count) * limit))
+
+    def sample(self, count: int, speed: float, heights: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Horizontal velocities and launch heights of ``count`` electrons.
+
+        ``speed`` is the speed of an electron with the maximal kinetic energy,
+        one for all or one per electron, ``heights`` the inclusive range of
+        launch heights.
+        """
+        velocity = speed * np.sqrt(self.energy_fraction(count))
+        velocity_x = velocity * np.cos(self.angles(count))
+        y = self.rng.integers(heights[0], heights[1], count, endpoint=True)
+        return velocity_x, y
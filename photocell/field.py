@@ -0,0 +1,206 @@
+"""Electrostatic field between the electrodes, solved on a grid.
+
+The potential inside the glass tube is solved once per electrode geometry,
+with the catode at 0 V and the anode at 1 V, by red-black successive
+over-relaxation on numpy arrays. The glass is an insulator, so no field
+crosses the border of the grid. The field is linear in the voltage, so
+every other voltage only scales the solution, the voltage slider never
+triggers a new solve. Solutions are cached on disk like the physics tables.
+
+``FieldElectrons`` samples the field at every electron by bilinear
+interpolation and moves the electrons in both directions, so they are bent
+by the fringe field at the ends of the electrodes::
+
+    Simulation(electrons=FieldElectrons(potential_field()))
+"""
+import hashlib
+import os
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .core import Electrons, electrode_distance, electrons_per_display, launch_x, space_between_electrodes
+from .tables import cache_root, electron_mass, elementary_charge, save_array
+
+# the electrodes are electrode_distance apart and as far as the space between them is wide
+metres_per_pixel = electrode_distance / space_between_electrodes[2]
+
+
+class Geometry(NamedTuple):
+    """Electrodes and glass tube in the pixel coordinates of the window."""
+    domain: Tuple[int, int, int, int] = (115, 105, 745, 130)  # inside of the tube, left, top, width, height
+    catode: Tuple[int, int, int] = (233, 121, 221)  # x, top, bottom
+    anode: Tuple[int, int, int] = (730, 121, 221)
+    cell: int = 2  # pixels per grid cell
+
+
+def _electrode_cells(geometry: Geometry, electrode: Tuple[int, int, int]) -> Tuple[int, slice]:
+    left, top = geometry.domain[:2]
+    x, y0, y1 = electrode
+    i = int(round((x - left) / geometry.cell))
+    return i, slice(int(round((y0 - top) / geometry.cell)), int(round((y1 - top) / geometry.cell)) + 1)
+
+
+def solve(geometry: Geometry = Geometry(), tolerance: float = 1e-6, omega: float = 1.9, max_iterations: int = 20000) -> np.ndarray:
+    """Potential at 1 V on the anode, indexed ``[x cell, y cell]``."""
+    left, top, width, height = geometry.domain
+    nx = width // geometry.cell + 1
+    ny = height // geometry.cell + 1
+
+    catode_i, catode_j = _electrode_cells(geometry, geometry.catode)
+    anode_i, anode_j = _electrode_cells(geometry, geometry.anode)
+    fixed = np.zeros((nx, ny), dtype=bool)
+    fixed[catode_i, catode_j] = True
+    fixed[anode_i, anode_j] = True
+    values = np.zeros((nx, ny))
+    values[anode_i, anode_j] = 1.0
+
+    # a linear ramp between the electrodes is close to the solution already
+    ramp = np.clip((np.arange(nx) - catode_i) / (anode_i - catode_i), 0, 1)
+    potential = np.repeat(ramp[:, None], ny, axis=1)
+    potential[fixed] = values[fixed]
+
+    i, j = np.meshgrid(np.arange(1, nx - 1), np.arange(1, ny - 1), indexing="ij")
+    colors = [((i + j) % 2 == c) & ~fixed[1:-1, 1:-1] for c in (0, 1)]
+    inner = potential[1:-1, 1:-1]
+
+    for iteration in range(max_iterations):
+        change = 0.0
+        for color in colors:
+            average = 0.25 * (potential[:-2, 1:-1] + potential[2:, 1:-1] + potential[1:-1, :-2] + potential[1:-1, 2:])
+            delta = omega * (average - inner)[color]
+            inner[color] += delta
+            change = max(change, float(np.abs(delta).max()))
+
+            # no field through the glass
+            potential[0, :] = potential[1, :]
+            potential[-1, :] = potential[-2, :]
+            potential[:, 0] = potential[:, 1]
+            potential[:, -1] = potential[:, -2]
+            potential[fixed] = values[fixed]
+
+        if change < tolerance:
+            break
+    return potential
+
+
+class PotentialField:
+    def __init__(self, geometry: Geometry, potential: np.ndarray) -> None:
+        self.geometry = geometry
+        self.potential = potential
+
+        # gradient of the potential at 1 V, in 1/m
+        step = geometry.cell * metres_per_pixel
+        gx, gy = np.gradient(potential, step)
+        self.gradient = np.stack((gx, gy))
+
+    def sample(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Gradient at the pixel positions ``x``, ``y`` by bilinear interpolation, shape ``(2, n)``."""
+        left, top = self.geometry.domain[:2]
+        nx, ny = self.potential.shape
+        fx = np.clip((x - left) / self.geometry.cell, 0, nx - 1.000001)
+        fy = np.clip((y - top) / self.geometry.cell, 0, ny - 1.000001)
+        i = fx.astype(np.intp)
+        j = fy.astype(np.intp)
+        tx = fx - i
+        ty = fy - j
+
+        g = self.gradient
+        return (g[:, i, j] * (1 - tx) * (1 - ty) + g[:, i + 1, j] * tx * (1 - ty)
+                + g[:, i, j + 1] * (1 - tx) * ty + g[:, i + 1, j + 1] * tx * ty)
+
+    def acceleration(self, x: np.ndarray, y: np.ndarray, voltage) -> np.ndarray:
+        """Acceleration of electrons at ``x``, ``y`` in m/s², shape ``(2, n)``."""
+        # the force on the negative charge points up the potential
+        return self.sample(x, y) * (np.asarray(voltage) * elementary_charge / electron_mass)
+
+
+def _cache_path(geometry: Geometry, cache_dir: str) -> str:
+    key = repr((tuple(geometry), "red-black sor"))
+    return os.path.join(cache_dir, f"potential_{hashlib.sha1(key.encode()).hexdigest()[:12]}.npy")
+
+
+_fields = {}
+
+
+def potential_field(geometry: Geometry = Geometry(), cache_dir: Optional[str] = os.path.join(cache_root, "field")) -> PotentialField:
+    try:
+        return _fields[geometry]
+    except KeyError:
+        pass
+
+    path = _cache_path(geometry, cache_dir) if cache_dir else None
+    if path and os.path.exists(path):
+        potential = np.load(path)
+    else:
+        potential = solve(geometry)
+        if path:
+            try:
+                save_array(path, potential)
+            except OSError:
+                pass
+
+    field = _fields[geometry] = PotentialField(geometry, potential)
+    return field
+
+
+class FieldElectrons(Electrons):
+    """``core.Electrons`` moving through a ``PotentialField`` in x and y."""
+    def __init__(self, field: Optional[PotentialField] = None, space: Tuple[int, int, int, int] = space_between_electrodes, capacity: int = 4096) -> None:
+        super().__init__(space, capacity)
+        self.field = potential_field() if field is None else field
+        self.delta_y = np.zeros(capacity, dtype=np.float64)
+        self.velocity_y = np.zeros(capacity, dtype=np.float64)
+
+    def grow(self, capacity: int) -> None:
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        self.delta_y = np.concatenate((self.delta_y, np.zeros(extra, dtype=self.delta_y.dtype)))
+        self.velocity_y = np.concatenate((self.velocity_y, np.zeros(extra, dtype=self.velocity_y.dtype)))
+        super().grow(capacity)
+
+    def spawn(self, velocity: np.ndarray, y: np.ndarray, x=launch_x, weight=electrons_per_display) -> np.ndarray:
+        slots = super().spawn(velocity, y, x, weight)
+        self.delta_y[slots] = 0
+        self.velocity_y[slots] = 0
+        return slots
+
+    def clear(self) -> None:
+        super().clear()
+        self.velocity_y[:] = 0
+        self.delta_y[:] = 0
+
+    def advance(self, timedelta: float, voltage) -> Tuple[np.ndarray, np.ndarray]:
+        alive = self.alive
+        w, h = self.size
+
+        self.delta_x += self.velocity * timedelta
+        self.delta_y += self.velocity_y * timedelta
+        moved_x = self.delta_x.astype(np.int64)
+        moved_y = self.delta_y.astype(np.int64)
+        self.x += moved_x
+        self.y += moved_y
+        self.delta_x -= moved_x
+        self.delta_y -= moved_y
+
+        left, top, width, height = self.space
+        at_anode = alive & (self.x >= left + width)
+        at_catode = alive & (self.x + w <= left)
+        alive &= (self.x + w > left) & (self.x < left + width)
+        alive &= (self.y + h > top) & (self.y < top + height)
+
+        self.velocity *= alive
+        self.velocity_y *= alive
+        self.delta_x *= alive
+        self.delta_y *= alive
+
+        # sampled at the centre of every electron still in flight
+        slots = np.flatnonzero(alive)
+        if np.ndim(voltage):
+            voltage = np.asarray(voltage)[slots]
+        ax, ay = self.field.acceleration(self.x[slots] + w / 2, self.y[slots] + h / 2, voltage)
+        self.velocity[slots] += ax * timedelta
+        self.velocity_y[slots] += ay * timedelta
+
+        return at_anode, at_catode
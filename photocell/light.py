@@ -0,0 +1,111 @@
+"""Light sources with a spectrum instead of a single wavelength.
+
+A ``Spectrum`` is built once from the spectral power of a lamp over the
+280-750 nm of the wavelength slider and kept as cumulative tables of its
+photons: the cumulative distribution on the spectral grid, for the fraction
+of photons below a threshold, and its inverse at fixed quantiles, for
+sampling. Sampling a batch of photons only indexes the quantile table, its
+cost does not depend on how finely the spectrum is resolved::
+
+    Simulation(spectrum=mercury_lamp())
+"""
+from functools import partial
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .tables import Boltzmann, Planck, photon_energy, speed_of_light, threshold_wave_length
+
+spectrum_range = (280, 750)  # nm, the range of the wavelength slider
+resolution = 0.1  # nm between the points of the spectral grid
+
+
+def spectral_grid() -> np.ndarray:
+    return np.linspace(*spectrum_range, int(round((spectrum_range[1] - spectrum_range[0]) / resolution)) + 1)
+
+
+class Spectrum:
+    """Photon distribution of a lamp, ``power`` is the spectral power at ``wave_lengths`` (nm)."""
+    def __init__(self, wave_lengths: np.ndarray, power: np.ndarray, quantiles: int = 8192) -> None:
+        wave_lengths = np.asarray(wave_lengths, dtype=np.float64)
+        # a photon carries hc/λ, so the photons per nm grow with λ at the same power
+        photons = np.asarray(power, dtype=np.float64) * wave_lengths
+        if photons.min() < 0 or not photons.any():
+            raise ValueError("the spectral power must be positive somewhere and negative nowhere")
+
+        cdf = np.concatenate(([0.0], np.cumsum((photons[1:] + photons[:-1]) / 2 * np.diff(wave_lengths))))
+        self.wave_lengths = wave_lengths
+        self.photons = photons / cdf[-1]  # photons per nm, 1 in total
+        self.cdf = cdf / cdf[-1]
+        # inverse of the cdf at evenly spaced probabilities
+        self.quantiles = np.interp(np.linspace(0, 1, quantiles), self.cdf, wave_lengths)
+        self.fractions = {}
+
+    def fraction_below(self, wave_length: float) -> float:
+        """Fraction of the photons with a wavelength below ``wave_length``."""
+        try:
+            return self.fractions[wave_length]
+        except KeyError:
+            fraction = self.fractions[wave_length] = float(np.interp(wave_length, self.wave_lengths, self.cdf))
+            return fraction
+
+    def sample(self, rng: np.random.Generator, count: int, below: Optional[float] = None) -> np.ndarray:
+        """Wavelengths in nm of ``count`` photons, only of those below ``below`` when given."""
+        u = rng.random(count)
+        if below is not None:
+            # drawn from the photons below the threshold only, not drawn and thrown away
+            u *= self.fraction_below(below)
+        position = u * (self.quantiles.size - 1)
+        i = np.minimum(position.astype(np.intp), self.quantiles.size - 2)
+        t = position - i
+        wave_lengths = self.quantiles[i] * (1 - t) + self.quantiles[i + 1] * t
+        if below is not None:
+            # between two quantiles that straddle a gap of a line spectrum the
+            # interpolation can step over the threshold
+            np.minimum(wave_lengths, below, out=wave_lengths)
+        return wave_lengths
+
+    def kinetic_energy(self, rng: np.random.Generator, count: int, work_function: float) -> np.ndarray:
+        """Maximal kinetic energy in J of ``count`` electrons freed from a catode, ``work_function`` in J."""
+        wave_lengths = self.sample(rng, count, float(threshold_wave_length(work_function)))
+        return np.maximum(photon_energy(wave_lengths) - work_function, 0)
+
+
+def lines(wave_lengths: Sequence[float], intensities: Sequence[float], width: float = 1.0) -> Spectrum:
+    """Emission lines of the given relative ``intensities``, ``width`` is the standard deviation in nm."""
+    grid = spectral_grid()
+    power = np.zeros_like(grid)
+    for wave_length, intensity in zip(wave_lengths, intensities):
+        power += intensity * np.exp(-0.5 * ((grid - wave_length) / width)**2)
+    return Spectrum(grid, power)
+
+
+def mercury_lamp() -> Spectrum:
+    # the strong lines of a medium pressure mercury lamp, relative power
+    return lines(
+        (296.7, 302.2, 313.0, 334.1, 365.0, 404.7, 435.8, 546.1, 577.0, 579.1),
+        (0.1, 0.15, 0.4, 0.05, 1.0, 0.4, 0.75, 0.9, 0.35, 0.35),
+    )
+
+
+def white_led() -> Spectrum:
+    # blue diode and the broad yellow emission of its phosphor
+    grid = spectral_grid()
+    power = np.exp(-0.5 * ((grid - 450) / 10)**2) + 0.45 * np.exp(-0.5 * ((grid - 570) / 50)**2)
+    return Spectrum(grid, power)
+
+
+def blackbody(temperature: float) -> Spectrum:
+    """Thermal radiation of a body at ``temperature`` in K, by Planck's law."""
+    grid = spectral_grid()
+    wave_lengths = grid * 1e-9
+    power = wave_lengths**-5 / np.expm1(Planck * speed_of_light / (wave_lengths * Boltzmann * temperature))
+    return Spectrum(grid, power)
+
+
+spectra: Dict[str, partial] = {
+    "mercury": partial(mercury_lamp),
+    "led": partial(white_led),
+    "halogen": partial(blackbody, 3200),
+    "sun": partial(blackbody, 5800),
+}
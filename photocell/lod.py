@@ -0,0 +1,50 @@
+"""Adaptive level of detail for the drawn electrons.
+
+``LevelOfDetail`` watches the frame time and changes how many real electrons
+one drawn electron stands for, so the number of electrons in flight stays
+within what the frame budget allows. Every drawn electron carries its weight,
+so the collected charge stays exact whatever the ratio is.
+"""
+from .core import Simulation, electrons_per_display
+
+
+class LevelOfDetail:
+    def __init__(self, simulation: Simulation, frame_budget: float = 1 / 90, min_ratio: float = electrons_per_display, max_ratio: float = electrons_per_display * 1e4, smoothing: float = 0.1, coarsen: float = 1.25, refine: float = 1.05, headroom: float = 0.7) -> None:
+        self.simulation = simulation
+        self.frame_budget = frame_budget
+        self.min_ratio = min_ratio
+        self.max_ratio = max_ratio
+
+        self.smoothing = smoothing
+        self.coarsen = coarsen
+        self.refine = refine
+        self.headroom = headroom
+
+        self.frame_time = None
+        self.enabled = True
+
+    @property
+    def ratio(self) -> float:
+        return self.simulation.electrons_per_display
+
+    @ratio.setter
+    def ratio(self, value: float) -> None:
+        value = min(max(value, self.min_ratio), self.max_ratio)
+        # through a worker or a connection every assignment is a command
+        if value != self.simulation.electrons_per_display:
+            self.simulation.electrons_per_display = value
+
+    def update(self, frame_time: float) -> float:
+        """Takes the work time of the last frame, returns the new ratio."""
+        if self.frame_time is None:
+            self.frame_time = frame_time
+        else:
+            self.frame_time += self.smoothing * (frame_time - self.frame_time)
+
+        if not self.enabled:
+            self.ratio = self.min_ratio
+        elif self.frame_time > self.frame_budget:
+            self.ratio *= self.coarsen
+        elif self.frame_time < self.frame_budget * self.headroom:
+            self.ratio /= self.refine
+        return self.ratio
@@ -0,0 +1,120 @@
+"""Per-frame phase timing for the main loop.
+
+``FrameProfiler.span(name)`` times a phase with ``perf_counter_ns``. When
+profiling is off, main uses ``NullProfiler``, whose spans are one shared
+no-op context manager, so the instrumentation costs next to nothing.
+The recorded frames can be exported as Chrome trace events and opened in
+chrome://tracing or Perfetto.
+"""
+import json
+import time
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "FrameProfiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.spans.append((self.name, self.start, time.perf_counter_ns() - self.start))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class NullProfiler:
+    enabled = False
+    _span = _NullSpan()
+
+    def span(self, name: str) -> _NullSpan:
+        return self._span
+
+    def begin_frame(self) -> None:
+        pass
+
+    def end_frame(self, **counters: float) -> None:
+        pass
+
+
+class FrameProfiler:
+    enabled = True
+
+    def __init__(self, frames: int = 600, trace_frames: int = 36000) -> None:
+        self.frame_start = None
+        self.spans = []
+        self._spans = {}
+
+        # (start, duration, spans, counters) of the recent frames
+        self.frames = deque(maxlen=frames)
+        self.trace = deque(maxlen=trace_frames)
+
+    def span(self, name: str) -> _Span:
+        try:
+            return self._spans[name]
+        except KeyError:
+            span = self._spans[name] = _Span(self, name)
+            return span
+
+    def begin_frame(self) -> None:
+        self.frame_start = time.perf_counter_ns()
+        self.spans = []
+
+    def end_frame(self, **counters: float) -> None:
+        if self.frame_start is None:
+            return
+        frame = (self.frame_start, time.perf_counter_ns() - self.frame_start, self.spans, counters)
+        self.frames.append(frame)
+        self.trace.append(frame)
+        self.frame_start = None
+
+    def percentiles(self, q=(50, 95, 99)) -> Dict[int, float]:
+        """Frame time percentiles of the recent frames, in ms."""
+        if not self.frames:
+            return {p: 0.0 for p in q}
+        durations = np.fromiter((f[1] for f in self.frames), dtype=np.float64, count=len(self.frames))
+        return dict(zip(q, (np.percentile(durations, q) / 1e6).tolist()))
+
+    def breakdown(self) -> Dict[str, float]:
+        """Mean time per frame of every phase of the recent frames, in ms."""
+        totals = {}
+        for frame in self.frames:
+            for name, start, duration in frame[2]:
+                totals[name] = totals.get(name, 0) + duration
+        count = len(self.frames) or 1
+        return {name: total / count / 1e6 for name, total in totals.items()}
+
+    def counters(self) -> Dict[str, float]:
+        return self.frames[-1][3] if self.frames else {}
+
+    def chrome_trace(self) -> dict:
+        events = []
+        origin = self.trace[0][0] if self.trace else 0
+        for start, duration, spans, counters in self.trace:
+            events.append({"name": "frame", "ph": "X", "ts": (start - origin) / 1e3, "dur": duration / 1e3, "pid": 1, "tid": 1})
+            for name, span_start, span_duration in spans:
+                events.append({"name": name, "ph": "X", "ts": (span_start - origin) / 1e3, "dur": span_duration / 1e3, "pid": 1, "tid": 1})
+            if counters:
+                events.append({"name": "counters", "ph": "C", "ts": (start - origin) / 1e3, "pid": 1, "args": counters})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
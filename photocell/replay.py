@@ -0,0 +1,197 @@
+"""Deterministic record and replay of a simulation run.
+
+``Recorder`` writes a compact binary log: the seed and timestep of the run,
+the input fed to ``Settings.handle_input``, every change of the simulation
+parameters and the number of physics steps of each frame. ``Replay`` runs
+the log again headless and as fast as possible. It reproduces the electron
+state bit for bit, which the digest stored at the end of the log confirms.
+Snapshots taken while replaying let ``seek`` jump to any frame::
+
+    python -m photocell.replay run.log --verify
+"""
+import argparse
+import bisect
+import copy
+import hashlib
+import struct
+import time
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import Simulation, materials
+from .trajectory import AnalyticElectrons
+
+magic = b"PCRL"
+version = 1
+header = struct.Struct("<4sHqd?")  # magic, version, seed, timedelta, analytic
+record = struct.Struct("<IBfdd")  # frame, kind, seconds since start, a, b
+record_dtype = np.dtype([("frame", "<u4"), ("kind", "u1"), ("time", "<f4"), ("a", "<f8"), ("b", "<f8")])
+digest_size = hashlib.sha1().digest_size
+
+STEPS, MOUSESTART, MOUSEPOS, MOUSESTOP, LIGHT, WAVE, VOLTAGE, MATERIAL, RATIO, END = range(10)
+input_kinds = {"mousestart": MOUSESTART, "mousepos": MOUSEPOS, "mousestop": MOUSESTOP}
+input_types = {kind: name for name, kind in input_kinds.items()}
+
+
+def _parameters(simulation: Simulation) -> Tuple[Tuple[int, float], ...]:
+    return (
+        (LIGHT, simulation.light_performance),
+        (WAVE, simulation.wave_length),
+        (VOLTAGE, simulation.voltage),
+        (MATERIAL, materials.index(simulation.catode_mat)),
+        (RATIO, simulation.electrons_per_display),
+    )
+
+
+def _apply(simulation: Simulation, kind: int, value: float) -> None:
+    if kind == LIGHT:
+        simulation.light_performance = value
+    elif kind == WAVE:
+        simulation.wave_length = int(value)
+    elif kind == VOLTAGE:
+        simulation.voltage = value
+    elif kind == MATERIAL:
+        simulation.catode_mat = materials[int(value)]
+    elif kind == RATIO:
+        simulation.electrons_per_display = value
+
+
+def state_digest(simulation: Simulation) -> bytes:
+    electrons = simulation.electrons
+    x, y = electrons.positions()
+    velocity = electrons.velocity[electrons.alive]
+    counters = np.array([simulation.time, simulation.electron_count, simulation.emitted, simulation.collected, simulation.returned])
+    digest = hashlib.sha1()
+    for array in (x, y, velocity, counters):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.digest()
+
+
+def new_simulation(seed: int, analytic: bool) -> Simulation:
+    electrons = AnalyticElectrons() if analytic else None
+    return Simulation(seed=seed, electrons=electrons)
+
+
+class Recorder:
+    def __init__(self, path: str, seed: int, timedelta: float, analytic: bool = True, clock: Optional[Callable[[], float]] = None) -> None:
+        self.file = open(path, "wb")
+        self.file.write(header.pack(magic, version, seed, timedelta, analytic))
+
+        self.clock = time.perf_counter if clock is None else clock
+        self.start = self.clock()
+
+        self.frame_index = 0
+        self.parameters = {}
+
+    def write(self, kind: int, a: float = 0.0, b: float = 0.0) -> None:
+        self.file.write(record.pack(self.frame_index, kind, self.clock() - self.start, a, b))
+
+    def input(self, type: str, pos: Tuple[int]) -> None:
+        self.write(input_kinds[type], *pos)
+
+    def frame(self, simulation: Simulation, steps: int) -> None:
+        """Ends a frame, call it before running its ``steps`` physics steps."""
+        for kind, value in _parameters(simulation):
+            if self.parameters.get(kind) != value:
+                self.parameters[kind] = value
+                self.write(kind, value)
+        self.write(STEPS, steps)
+        self.frame_index += 1
+
+    def close(self, simulation: Simulation) -> None:
+        self.write(END)
+        self.file.write(state_digest(simulation))
+        self.file.close()
+
+
+class Replay:
+    def __init__(self, path: str, snapshot_every: int = 600) -> None:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        file_magic, file_version, self.seed, self.timedelta, self.analytic = header.unpack_from(data)
+        if file_magic != magic or file_version != version:
+            raise ValueError(f"{path} is not a version {version} photocell replay log")
+
+        body = data[header.size:]
+        self.digest = None
+        count = len(body) // record.size
+        self.records = np.frombuffer(body, dtype=record_dtype, count=count)
+        if count and self.records[-1]["kind"] == END:
+            self.digest = body[count * record.size:count * record.size + digest_size]
+        self.frames = int(np.count_nonzero(self.records["kind"] == STEPS))
+
+        self.snapshot_every = snapshot_every
+        # (frame, index of its first record, simulation at its start)
+        self.snapshots = [(0, 0, new_simulation(self.seed, self.analytic))]
+
+    def seek(self, frame: int) -> Tuple[Simulation, int]:
+        """Simulation at the start of ``frame`` and the index of its first record."""
+        i = bisect.bisect_right([s[0] for s in self.snapshots], frame) - 1
+        start_frame, index, snapshot = self.snapshots[i]
+        simulation = copy.deepcopy(snapshot)
+        if start_frame < frame:
+            simulation, index = self.run(until=frame, simulation=simulation, index=index)
+        return simulation, index
+
+    def run(self, until: Optional[int] = None, simulation: Optional[Simulation] = None, index: int = 0, handle_input: Optional[Callable[[Tuple[int], str], None]] = None) -> Tuple[Simulation, int]:
+        """Replays from record ``index`` up to the start of frame ``until``, or to the end.
+
+        ``handle_input`` receives the recorded input, for example the
+        ``handle_input`` of a ``Settings`` drawn over ``simulation``.
+        """
+        if simulation is None:
+            simulation = new_simulation(self.seed, self.analytic)
+        timedelta = self.timedelta
+        records = self.records
+        last_snapshot = self.snapshots[-1][0]
+
+        while index < len(records):
+            frame, kind, _, a, b = records[index].item()
+            if until is not None and frame >= until:
+                break
+            if kind == END:
+                break
+
+            if kind == STEPS:
+                for i in range(int(a)):
+                    simulation.step(timedelta)
+                if frame + 1 - last_snapshot >= self.snapshot_every and index + 1 < len(records):
+                    last_snapshot = frame + 1
+                    self.snapshots.append((last_snapshot, index + 1, copy.deepcopy(simulation)))
+            elif kind in input_types:
+                if handle_input is not None:
+                    handle_input((int(a), int(b)), input_types[kind])
+            else:
+                _apply(simulation, kind, a)
+            index += 1
+
+        return simulation, index
+
+    def verify(self, simulation: Simulation) -> bool:
+        return self.digest is not None and state_digest(simulation) == self.digest
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a photocell log headless.")
+    parser.add_argument("log")
+    parser.add_argument("--until", type=int, default=None, help="stop at the start of this frame")
+    parser.add_argument("--verify", action="store_true", help="compare the final state with the recorded digest")
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.log)
+    start = time.perf_counter()
+    simulation, index = replay.run(until=args.until)
+    elapsed = time.perf_counter() - start
+    print(f"replayed {replay.frames if args.until is None else args.until} frames, {simulation.time:.6g} s simulated in {elapsed:.3f} s")
+
+    if args.verify:
+        if replay.verify(simulation):
+            print("state matches the recording")
+        else:
+            raise SystemExit("state differs from the recording")
+
+
+if __name__ == "__main__":
+    main()
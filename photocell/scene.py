@@ -0,0 +1,93 @@
+"""Several photocells advanced by one shared electron engine.
+
+Every cell keeps its own ``Simulation`` for its parameters, emission and
+readouts, but the electrons of all cells live in one ``CellElectrons`` buffer
+and are advanced together with per-slot voltages. The cost of a step grows
+with the total number of electrons, not with the number of cells.
+"""
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from .core import Electrons, Simulation, electrons_per_display, launch_x
+
+
+class CellElectrons(Electrons):
+    """``Electrons`` with the index of the cell that owns each slot."""
+    def __init__(self, cells: int, capacity: int = 4096) -> None:
+        super().__init__(capacity=capacity)
+        self.cells = cells
+        self.cell = np.zeros(capacity, dtype=np.intp)
+
+        # per-cell results of the last step, read by the CellView of each cell
+        self.collected = np.zeros(cells)
+        self.returned = np.zeros(cells)
+
+    def grow(self, capacity: int) -> None:
+        extra = capacity - self.capacity
+        super().grow(capacity)
+        if extra > 0:
+            self.cell = np.concatenate((self.cell, np.zeros(extra, dtype=self.cell.dtype)))
+
+    def spawn_in(self, cell: int, velocity: np.ndarray, y: np.ndarray, x=launch_x, weight=electrons_per_display) -> np.ndarray:
+        slots = self.spawn(velocity, y, x, weight)
+        self.cell[slots] = cell
+        return slots
+
+    def step_cells(self, timedelta: float, voltages: np.ndarray) -> None:
+        at_anode, at_catode = self.advance(timedelta, voltages[self.cell])
+        self.collected = np.bincount(self.cell, self.weight * at_anode, minlength=self.cells)
+        self.returned = np.bincount(self.cell, self.weight * at_catode, minlength=self.cells)
+
+
+class CellView:
+    """The electrons of one cell, given to its Simulation in place of ``Electrons``."""
+    def __init__(self, electrons: CellElectrons, cell: int) -> None:
+        self.shared = electrons
+        self.cell = cell
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.mask()))
+
+    def mask(self) -> np.ndarray:
+        return self.shared.alive & (self.shared.cell == self.cell)
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self.mask()
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self.shared.velocity
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        slots = np.flatnonzero(self.mask())
+        return self.shared.x[slots], self.shared.y[slots]
+
+    def spawn(self, velocity: np.ndarray, y: np.ndarray, x=launch_x, weight=electrons_per_display) -> np.ndarray:
+        return self.shared.spawn_in(self.cell, velocity, y, x, weight)
+
+    def step(self, timedelta: float, voltage: float) -> Tuple[float, float]:
+        # the Scene has already advanced the shared buffer
+        return float(self.shared.collected[self.cell]), float(self.shared.returned[self.cell])
+
+
+class Scene:
+    def __init__(self, simulations: Iterable[Simulation]) -> None:
+        self.cells = list(simulations)
+        self.electrons = CellElectrons(len(self.cells))
+        for i, simulation in enumerate(self.cells):
+            simulation.electrons = CellView(self.electrons, i)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def step(self, timedelta: float) -> int:
+        voltages = np.array([cell.voltage for cell in self.cells])
+        self.electrons.step_cells(timedelta, voltages)
+        return sum(cell.step(timedelta) for cell in self.cells)
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Cell index, x and y of every electron in flight."""
+        slots = np.flatnonzero(self.electrons.alive)
+        return self.electrons.cell[slots], self.electrons.x[slots], self.electrons.y[slots]
@@ -0,0 +1,82 @@
+"""Fixed-timestep scheduling of the physics, independent of the frame rate.
+
+Real time is collected in an accumulator and spent in physics substeps of a
+fixed length, so the simulated speed no longer depends on how fast the
+machine renders. Fast-forward runs more substeps per frame, the length of a
+substep never changes.
+"""
+import time
+from typing import Any, Callable, Optional
+
+
+class Scheduler:
+    def __init__(self, physics_rate: float = 60, timescale: float = 2e-5, max_fps: Optional[float] = 60, time_acceleration: float = 1.0, min_acceleration: float = 0.1, max_acceleration: float = 100.0, max_frame_time: float = 0.25, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.physics_rate = physics_rate
+        self.timescale = timescale
+        self.max_fps = max_fps
+        self.min_acceleration = min_acceleration
+        self.max_acceleration = max_acceleration
+        self.time_acceleration = time_acceleration
+        # longer pauses (window dragged, debugger) are dropped, not caught up
+        self.max_frame_time = max_frame_time
+
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last_time = None
+        self.next_frame = None
+
+    @property
+    def timedelta(self) -> float:
+        """Simulated seconds advanced by one physics substep."""
+        return self.timescale / self.physics_rate
+
+    @property
+    def time_acceleration(self) -> float:
+        return self._time_acceleration
+
+    @time_acceleration.setter
+    def time_acceleration(self, value: float) -> None:
+        self._time_acceleration = min(max(value, self.min_acceleration), self.max_acceleration)
+
+    def speed_up(self, factor: float = 2.0) -> None:
+        self.time_acceleration *= factor
+
+    def slow_down(self, factor: float = 2.0) -> None:
+        self.time_acceleration /= factor
+
+    def substeps(self) -> int:
+        """Number of physics substeps owed for the real time passed since the last call."""
+        now = self.clock()
+        if self.last_time is None:
+            self.last_time = now
+            return 0
+
+        elapsed = min(now - self.last_time, self.max_frame_time)
+        self.last_time = now
+
+        self.accumulator += elapsed * self.time_acceleration * self.physics_rate
+        steps = int(self.accumulator)
+        self.accumulator -= steps
+        return steps
+
+    def run(self, step: Callable[[float], Any]) -> int:
+        steps = self.substeps()
+        timedelta = self.timedelta
+        for i in range(steps):
+            step(timedelta)
+        return steps
+
+    def pace(self) -> None:
+        """Sleeps until the next frame is due when a frame cap is set."""
+        if not self.max_fps:
+            return
+
+        frame_time = 1 / self.max_fps
+        now = self.clock()
+        if self.next_frame is None or now - self.next_frame > frame_time:
+            self.next_frame = now
+        self.next_frame += frame_time
+
+        remaining = self.next_frame - now
+        if remaining > 0:
+            time.sleep(remaining)
@@ -0,0 +1,414 @@
+"""One simulation broadcast to many viewers over local TCP.
+
+``Server`` steps a ``Simulation`` on an asyncio loop and sends every frame
+to all connected clients: the parameters, the readouts and the electron
+positions. A client that received the previous frame gets a delta against it,
+the others a key frame with the full state. Electron arrays are sent as
+16 bit integers and deflated. A slow client is never waited for: clients
+confirm every frame they read, at most ``window`` frames are on their way to
+a client, and newer frames replace the one it is waiting for, so it skips
+the intermediate frames and catches up with the next key frame.
+
+Clients send parameter commands back, every viewer sees their effect::
+
+    python -m photocell.server serve --port 8765
+    python main.py --connect localhost:8765
+    python -m photocell.server load --clients 300 --seconds 10
+
+``Connection`` is the client of a pygame viewer, it stands in for the
+``PhysicsWorker`` behind a ``SimulationProxy``.
+"""
+import argparse
+import asyncio
+import collections
+import socket
+import struct
+import threading
+import time
+import types
+import zlib
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import Simulation, materials
+from .replay import LIGHT, MATERIAL, RATIO, VOLTAGE, WAVE, _apply, _parameters
+from .scheduler import Scheduler
+from .trajectory import AnalyticElectrons
+from .worker import Snapshots
+
+KEY, DELTA, COMMAND, RECEIVED = range(1, 5)
+
+message = struct.Struct("<IB")  # length of the payload, kind
+ack = struct.Struct("<I")  # commands of this client applied before the frame
+frame_header = struct.Struct("<IdddddHdBdI")  # sequence, time, current, anode current, collected, light, wave, voltage, material, ratio, electrons
+delta_header = struct.Struct("<III")  # removed, added, kept
+command = struct.Struct("<Bd")  # parameter kind, value
+received = struct.Struct("<I")  # sequence of the last frame the client read
+
+parameter_kinds = {"light_performance": LIGHT, "wave_length": WAVE, "voltage": VOLTAGE, "catode_mat": MATERIAL, "electrons_per_display": RATIO}
+
+
+def encode_command(name: str, value: Any) -> bytes:
+    if name == "catode_mat":
+        value = materials.index(value)
+    return message.pack(command.size, COMMAND) + command.pack(parameter_kinds[name], value)
+
+
+def encode_received(sequence: int) -> bytes:
+    return message.pack(received.size, RECEIVED) + received.pack(sequence)
+
+
+class Frame:
+    """Encoded frame, shared by all clients."""
+    __slots__ = ("sequence", "key", "delta")
+
+    def __init__(self, sequence: int, key: bytes, delta: Optional[bytes]) -> None:
+        self.sequence = sequence
+        self.key = key
+        self.delta = delta
+
+
+class FrameEncoder:
+    def __init__(self, level: int = 1) -> None:
+        self.level = level
+        self.sequence = -1
+        self.slots = None
+        self.x = None
+        self.y = None
+
+    def encode(self, simulation: Simulation) -> Frame:
+        electrons = simulation.electrons
+        slots = np.flatnonzero(electrons.alive).astype(np.uint32)
+        x, y = electrons.positions()
+        x = x.astype(np.int16)
+        y = y.astype(np.int16)
+
+        self.sequence += 1
+        parameters = dict(_parameters(simulation))
+        header = frame_header.pack(
+            self.sequence, simulation.time, simulation.current, simulation.anode_current, simulation.collected,
+            parameters[LIGHT], parameters[WAVE], parameters[VOLTAGE], parameters[MATERIAL], parameters[RATIO],
+            slots.size,
+        )
+        key = header + zlib.compress(slots.tobytes() + x.tobytes() + y.tobytes(), self.level)
+
+        delta = None
+        if self.slots is not None:
+            kept_before = np.isin(self.slots, slots, assume_unique=True)
+            kept_now = np.isin(slots, self.slots, assume_unique=True)
+            removed = self.slots[~kept_before]
+            added = ~kept_now
+            # a slot freed and reused in between counts as kept, dx and dy move it to the new electron
+            dx = x[kept_now] - self.x[kept_before]
+            dy = y[kept_now] - self.y[kept_before]
+            arrays = (removed, slots[added], x[added], y[added], dx, dy)
+            delta = header + delta_header.pack(removed.size, int(np.count_nonzero(added)), dx.size) + zlib.compress(b"".join(a.tobytes() for a in arrays), self.level)
+
+        self.slots, self.x, self.y = slots, x, y
+        return Frame(self.sequence, key, delta)
+
+
+class FrameDecoder:
+    def __init__(self) -> None:
+        self.sequence = -1
+        self.slots = np.empty(0, dtype=np.uint32)
+        self.x = np.empty(0, dtype=np.int16)
+        self.y = np.empty(0, dtype=np.int16)
+        self.time = self.current = self.anode_current = self.collected = 0.0
+        self.parameters = {}
+
+    def decode(self, kind: int, body: memoryview) -> None:
+        sequence, self.time, self.current, self.anode_current, self.collected, light, wave, voltage, material, ratio, count = frame_header.unpack_from(body)
+        self.parameters = {
+            "light_performance": light,
+            "wave_length": wave,
+            "voltage": voltage,
+            "catode_mat": materials[material],
+            "electrons_per_display": ratio,
+        }
+
+        if kind == KEY:
+            data = zlib.decompress(body[frame_header.size:])
+            self.slots = np.frombuffer(data, np.uint32, count)
+            self.x = np.frombuffer(data, np.int16, count, count * 4)
+            self.y = np.frombuffer(data, np.int16, count, count * 6)
+        else:
+            if sequence != self.sequence + 1:
+                raise ValueError(f"delta of frame {sequence} does not follow frame {self.sequence}")
+            removed, added, kept = delta_header.unpack_from(body, frame_header.size)
+            data = zlib.decompress(body[frame_header.size + delta_header.size:])
+            offset = 0
+            arrays = []
+            for dtype, size in ((np.uint32, removed), (np.uint32, added), (np.int16, added), (np.int16, added), (np.int16, kept), (np.int16, kept)):
+                arrays.append(np.frombuffer(data, dtype, size, offset))
+                offset += size * np.dtype(dtype).itemsize
+            removed, added_slots, added_x, added_y, dx, dy = arrays
+
+            keep = ~np.isin(self.slots, removed, assume_unique=True)
+            slots = np.concatenate((self.slots[keep], added_slots))
+            x = np.concatenate((self.x[keep] + dx, added_x))
+            y = np.concatenate((self.y[keep] + dy, added_y))
+            order = np.argsort(slots, kind="stable")
+            self.slots, self.x, self.y = slots[order], x[order], y[order]
+
+        self.sequence = sequence
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.frame = None  # newest frame not sent yet
+        self.ready = asyncio.Event()
+        self.sent = -1
+        self.unconfirmed = collections.deque()  # sequences sent and not confirmed yet
+        self.window_open = asyncio.Event()
+        self.commands = 0
+
+
+class Server:
+    def __init__(self, simulation: Simulation, scheduler: Scheduler, window: int = 2, send_buffer: int = 16384) -> None:
+        self.simulation = simulation
+        self.scheduler = scheduler
+        # frames sent to a client and not confirmed yet, a slow client skips
+        # frames rather than queue seconds of them in the socket buffers
+        self.window = window
+        self.send_buffer = send_buffer
+        self.encoder = FrameEncoder()
+        self.clients = []
+
+    async def serve(self, host: str = "localhost", port: int = 8765) -> None:
+        server = await asyncio.start_server(self.connect, host, port)
+        async with server:
+            await self.run()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        frame_time = 1 / self.scheduler.max_fps
+        next_frame = loop.time()
+        while True:
+            self.tick()
+            next_frame += frame_time
+            await asyncio.sleep(max(next_frame - loop.time(), 0))
+
+    def tick(self) -> None:
+        scheduler = self.scheduler
+        for i in range(scheduler.substeps()):
+            self.simulation.step(scheduler.timedelta)
+        if not self.clients:
+            return
+
+        frame = self.encoder.encode(self.simulation)
+        for client in self.clients:
+            client.frame = frame
+            client.ready.set()
+
+    async def connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        sock = writer.get_extra_info("socket")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        writer.transport.set_write_buffer_limits(high=self.send_buffer)
+        client = _Client(writer)
+        self.clients.append(client)
+        sender = asyncio.ensure_future(self.send(client))
+        try:
+            while True:
+                length, kind = message.unpack(await reader.readexactly(message.size))
+                payload = await reader.readexactly(length)
+                if kind == COMMAND:
+                    parameter, value = command.unpack(payload)
+                    _apply(self.simulation, parameter, value)
+                    client.commands += 1
+                elif kind == RECEIVED:
+                    sequence, = received.unpack(payload)
+                    unconfirmed = client.unconfirmed
+                    while unconfirmed and unconfirmed[0] <= sequence:
+                        unconfirmed.popleft()
+                    client.window_open.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.remove(client)
+            sender.cancel()
+            writer.close()
+
+    async def send(self, client: _Client) -> None:
+        writer = client.writer
+        while True:
+            await client.ready.wait()
+            while len(client.unconfirmed) >= self.window:
+                # newer frames keep replacing client.frame meanwhile
+                client.window_open.clear()
+                await client.window_open.wait()
+            client.ready.clear()
+            frame, client.frame = client.frame, None
+
+            if frame.sequence == client.sent + 1 and frame.delta is not None:
+                kind, body = DELTA, frame.delta
+            else:
+                kind, body = KEY, frame.key
+            client.sent = frame.sequence
+            client.unconfirmed.append(frame.sequence)
+
+            writer.write(message.pack(ack.size + len(body), kind) + ack.pack(client.commands))
+            writer.write(body)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                return
+
+
+class Connection(threading.Thread):
+    """Receives the frames of a ``Server`` on a thread, like a ``PhysicsWorker``.
+
+    ``simulation`` holds the parameters of the served simulation, parameters
+    set here are kept until the server has applied them.
+    """
+    def __init__(self, host: str = "localhost", port: int = 8765) -> None:
+        super().__init__(name="connection", daemon=True)
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile("rb")
+
+        self.decoder = FrameDecoder()
+        self.commands = 0
+        self.received = 0
+        # commands from the render thread and confirmations from this one share the socket
+        self.send_lock = threading.Lock()
+        self.snapshots = Snapshots()
+
+        kind, body = self.receive()
+        self.handle(kind, body)
+        self.socket.sendall(encode_received(self.decoder.sequence))
+        # frames do not carry a spectrum, served simulations have a single wavelength
+        self.simulation = types.SimpleNamespace(spectrum=None, **self.decoder.parameters)
+
+    def receive(self) -> Tuple[int, memoryview]:
+        header = self.file.read(message.size)
+        if len(header) < message.size:
+            raise ConnectionError("the server closed the connection")
+        length, kind = message.unpack(header)
+        return kind, memoryview(self.file.read(length))
+
+    def handle(self, kind: int, body: memoryview) -> int:
+        applied, = ack.unpack_from(body)
+        decoder = self.decoder
+        decoder.decode(kind, body[ack.size:])
+
+        self.received += 1
+        back = self.snapshots.back()
+        count = decoder.slots.size
+        if count > back.x.size:
+            back.x = np.zeros(count * 2, dtype=np.int64)
+            back.y = np.zeros(count * 2, dtype=np.int64)
+        back.x[:count] = decoder.x
+        back.y[:count] = decoder.y
+        back.in_flight = count
+        back.time = decoder.time
+        back.current = decoder.current
+        back.anode_current = decoder.anode_current
+        back.collected = decoder.collected
+        back.sequence = decoder.sequence
+        self.snapshots.publish(back)
+        return applied
+
+    def run(self) -> None:
+        try:
+            while True:
+                applied = self.handle(*self.receive())
+                with self.send_lock:
+                    self.socket.sendall(encode_received(self.decoder.sequence))
+                if applied >= self.commands:
+                    self.simulation.__dict__.update(self.decoder.parameters)
+        except (ConnectionError, OSError, ValueError):
+            pass
+
+    def set(self, name: str, value: Any) -> None:
+        self.commands += 1
+        setattr(self.simulation, name, value)
+        with self.send_lock:
+            self.socket.sendall(encode_command(name, value))
+
+    def stop(self) -> None:
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+        self.join()
+
+
+async def _load_client(host: str, port: int, seconds: float, delay: float, stats: Dict[str, int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    decoder = FrameDecoder()
+    deadline = asyncio.get_running_loop().time() + seconds
+    last = None
+    try:
+        while asyncio.get_running_loop().time() < deadline:
+            length, kind = message.unpack(await reader.readexactly(message.size))
+            body = memoryview(await reader.readexactly(length))
+            decoder.decode(kind, body[ack.size:])
+            writer.write(encode_received(decoder.sequence))
+            stats["frames"] += 1
+            stats["bytes"] += message.size + length
+            stats["keys"] += kind == KEY
+            if last is not None:
+                stats["skipped"] += decoder.sequence - last - 1
+            last = decoder.sequence
+            if delay:
+                await asyncio.sleep(delay)
+    finally:
+        writer.close()
+
+
+async def load(host: str, port: int, clients: int, seconds: float, slow: int = 0, slow_delay: float = 0.1) -> Dict[str, int]:
+    """Connects ``clients`` viewers, the first ``slow`` of them read a frame every ``slow_delay`` seconds."""
+    fast = {"frames": 0, "bytes": 0, "keys": 0, "skipped": 0}
+    slow_stats = dict(fast)
+    tasks = [_load_client(host, port, seconds, slow_delay if i < slow else 0, slow_stats if i < slow else fast) for i in range(clients)]
+    await asyncio.gather(*tasks)
+    return {"fast": fast, "slow": slow_stats}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run a simulation and broadcast it")
+    serve_parser.add_argument("--host", default="localhost")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--seed", type=int, default=None)
+    serve_parser.add_argument("--fps", type=float, default=60)
+
+    load_parser = commands.add_parser("load", help="connect many viewers and report what they receive")
+    load_parser.add_argument("--host", default="localhost")
+    load_parser.add_argument("--port", type=int, default=8765)
+    load_parser.add_argument("--clients", type=int, default=100)
+    load_parser.add_argument("--slow", type=int, default=0, help="clients that read only every --slow-delay seconds")
+    load_parser.add_argument("--slow-delay", type=float, default=0.1)
+    load_parser.add_argument("--seconds", type=float, default=10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        simulation = Simulation(seed=args.seed, electrons=AnalyticElectrons())
+        server = Server(simulation, Scheduler(max_fps=args.fps))
+        print(f"serving on {args.host}:{args.port}")
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        start = time.perf_counter()
+        stats = asyncio.run(load(args.host, args.port, args.clients, args.seconds, args.slow, args.slow_delay))
+        elapsed = time.perf_counter() - start
+        for name, count in (("fast", args.clients - args.slow), ("slow", args.slow)):
+            s = stats[name]
+            if not count:
+                continue
+            print(f"{count} {name} clients: {s['frames'] / count / elapsed:.1f} frames/s each, "
+                  f"{s['bytes'] / max(s['frames'], 1):.0f} bytes/frame, {s['keys']} key frames, {s['skipped']} frames skipped")
+
+
+if __name__ == "__main__":
+    main()
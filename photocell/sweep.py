@@ -0,0 +1,162 @@
+"""Parameter sweeps over material, wavelength, voltage and light intensity.
+
+Every point of the grid is simulated headless in a process pool. Finished
+points are cached on disk by their parameters, so a repeated sweep only
+simulates the points that are not cached yet::
+
+    python -m photocell.sweep --materials Al Cs K --wavelengths 280 750 1 -o iv.npz
+"""
+import argparse
+import hashlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import Simulation, elementary_charge, materials as all_materials
+from .tables import cache_root, save_array
+from .trajectory import AnalyticElectrons
+
+cache_version = 4
+
+result_dtype = np.dtype([
+    ("material", "U2"),
+    ("wave_length", np.float64),
+    ("voltage", np.float64),
+    ("light_performance", np.float64),
+    ("current", np.float64),
+    ("collected_charge", np.float64),
+    ("stopping_voltage", np.float64),
+])
+
+Point = Tuple[str, float, float, float]
+
+
+def point_key(point: Point, duration: float, timedelta: float, seed: int) -> str:
+    material, wave_length, voltage, light_performance = point
+    # ints, floats and numpy scalars of the same value give the same key
+    values = "|".join(repr(float(v)) for v in (wave_length, voltage, light_performance, duration, timedelta))
+    text = f"{cache_version}|{material}|{values}|{int(seed)}"
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def simulate_point(point: Point, duration: float, timedelta: float, seed: int, settle: float = 0.5) -> Tuple[float, float, float]:
+    """Returns the anode current, the collected charge and the stopping voltage of one point.
+
+    The current is averaged after the first ``settle`` part of the run, when
+    the electrons emitted first have had time to cross the electrodes.
+    """
+    material, wave_length, voltage, light_performance = point
+    simulation = Simulation(light_performance, wave_length, voltage, material, seed=seed, electrons=AnalyticElectrons())
+
+    if simulation.wave_length >= simulation.max_wavelength:
+        return 0.0, 0.0, float("nan")
+    stopping_voltage = simulation.kinetic_energy() / elementary_charge
+
+    steps = max(int(round(duration / timedelta)), 1)
+    settle_steps = int(steps * settle)
+    settled_charge = 0.0
+    for i in range(steps):
+        if i == settle_steps:
+            settled_charge = simulation.collected_charge
+        simulation.step(timedelta)
+
+    measured_time = (steps - settle_steps) * timedelta
+    current = (simulation.collected_charge - settled_charge) / measured_time
+    return current, simulation.collected_charge, stopping_voltage
+
+
+def _simulate_cached(args) -> Tuple[float, float, float]:
+    point, duration, timedelta, seed, cache_dir = args
+    key = point_key(point, duration, timedelta, seed)
+    point_seed = int(key[:8], 16)
+    values = simulate_point(point, duration, timedelta, point_seed)
+
+    if cache_dir is not None:
+        save_array(_cache_path(cache_dir, key), np.array(values, dtype=np.float64))
+    return values
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key[:2], f"{key}.npy")
+
+
+def sweep(materials: Optional[Sequence[str]] = None, wave_lengths: Iterable[float] = (515,), voltages: Iterable[float] = (5.05e-3,), light_performances: Iterable[float] = (2.5e19,), duration: float = 1e-3, timedelta: float = 1e-6, seed: int = 0, workers: Optional[int] = None, cache_dir: Optional[str] = None) -> np.ndarray:
+    """Simulates the grid materials x wave_lengths x voltages x light_performances.
+
+    Returns a structured array with one row per point, see ``result_dtype``.
+    """
+    if materials is None:
+        materials = all_materials
+    points = list(itertools.product(materials, wave_lengths, voltages, light_performances))
+
+    result = np.zeros(len(points), dtype=result_dtype)
+    for i, point in enumerate(points):
+        result[i]["material"], result[i]["wave_length"], result[i]["voltage"], result[i]["light_performance"] = point
+
+    pending = []
+    for i, point in enumerate(points):
+        path = None
+        if cache_dir is not None:
+            path = _cache_path(cache_dir, point_key(point, duration, timedelta, seed))
+        if path is not None and os.path.exists(path):
+            _set_values(result, i, np.load(path))
+        else:
+            pending.append(i)
+
+    if pending:
+        jobs = [(points[i], duration, timedelta, seed, cache_dir) for i in pending]
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, values in zip(pending, pool.map(_simulate_cached, jobs, chunksize=chunksize)):
+                _set_values(result, i, values)
+
+    return result
+
+
+def _set_values(result: np.ndarray, i: int, values) -> None:
+    result[i]["current"], result[i]["collected_charge"], result[i]["stopping_voltage"] = values
+
+
+def save(result: np.ndarray, path: str) -> None:
+    np.savez(path, **{name: result[name] for name in result.dtype.names})
+
+
+def load(path: str) -> np.ndarray:
+    with np.load(path) as data:
+        result = np.zeros(len(data["material"]), dtype=result_dtype)
+        for name in result_dtype.names:
+            result[name] = data[name]
+    return result
+
+
+def _range(values: Sequence[float]) -> np.ndarray:
+    if len(values) == 3:
+        start, stop, step = values
+        return np.arange(start, stop + step / 2, step)
+    return np.array(values, dtype=np.float64)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--materials", nargs="+", default=all_materials, choices=all_materials)
+    parser.add_argument("--wavelengths", nargs="+", type=float, default=[515], help="nm, a list or START STOP STEP")
+    parser.add_argument("--voltages", nargs="+", type=float, default=[5.05e-3], help="V, a list or START STOP STEP")
+    parser.add_argument("--intensities", nargs="+", type=float, default=[2.5e19], help="photons/s, a list or START STOP STEP")
+    parser.add_argument("--duration", type=float, default=1e-3, help="simulated seconds per point")
+    parser.add_argument("--timedelta", type=float, default=1e-6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=os.path.join(cache_root, "sweep"))
+    parser.add_argument("-o", "--output", default="sweep.npz")
+    args = parser.parse_args(argv)
+
+    result = sweep(args.materials, _range(args.wavelengths), _range(args.voltages), _range(args.intensities), args.duration, args.timedelta, args.seed, args.workers, args.cache)
+    save(result, args.output)
+    print(f"{len(result)} points written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
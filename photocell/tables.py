@@ -0,0 +1,138 @@
+"""Material table and precomputed physics lookup tables.
+
+``work_function_of_materials`` is the only hand-maintained material data, the
+threshold wavelengths are derived from it. ``lookup_tables()`` returns
+arrays indexed by ``[material index, wave_length - min_wave_length]`` for every
+whole nanometre, built once per process and cached on disk as ``.npy``.
+"""
+import hashlib
+import os
+import sys
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# exact SI values, the same scipy.constants has, without importing SciPy on startup
+speed_of_light = 299792458.0  # m/s
+Planck = 6.62607015e-34  # J s
+elementary_charge = 1.602176634e-19  # C
+Boltzmann = 1.380649e-23  # J/K
+electron_mass = 9.1e-31
+
+work_function_of_materials = {  # in aJ
+    "Al": 0.68,
+    "Au": 0.77,
+    "As": 0.82,
+    "Ba": 0.42,
+    "Be": 0.71,
+    "Cs": 0.31,
+    "Ce": 0.46,
+    "Eu": 0.4,
+    "Ag": 0.69,
+    "Ga": 0.66,
+    "Ge": 0.78,
+    "Hf": 0.62,
+    "Ca": 0.45,
+    "K": 0.36,
+    "Hg": 0.72,
+    "Pb": 0.66,
+}
+
+materials = list(work_function_of_materials)
+
+
+def _cache_root() -> str:
+    if getattr(sys, "frozen", False):
+        # a bundled build runs from a temporary directory that is gone after exit
+        return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "photocell")
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+
+
+# the disk caches do not depend on the working directory the program is started in
+cache_root = _cache_root()
+work_functions = np.array([work_function_of_materials[m] for m in materials]) * 1e-18  # in J
+
+
+def photon_energy(wave_length):
+    """Energy of a photon in J, ``wave_length`` in nm."""
+    return Planck * speed_of_light / (np.asarray(wave_length, dtype=np.float64) * 1e-9)
+
+
+def threshold_wave_length(work_function):
+    """Longest wavelength in nm that can free an electron, ``work_function`` in J."""
+    return Planck * speed_of_light / np.asarray(work_function, dtype=np.float64) * 1e9
+
+
+max_wavelength_of_materials = {  # in nm
+    m: float(threshold_wave_length(w)) for m, w in zip(materials, work_functions)
+}
+
+min_wave_length = 200
+max_wave_length = 1000
+
+
+class LookupTables(NamedTuple):
+    wave_lengths: np.ndarray  # whole nm, the column of each wavelength
+    photon_energy: np.ndarray  # J, one row per material
+    kinetic_energy: np.ndarray  # J, maximal kinetic energy, 0 below the threshold
+    emission_speed: np.ndarray  # m/s of an electron with the maximal kinetic energy
+    stopping_voltage: np.ndarray  # V
+
+    def column(self, wave_length: int) -> Optional[int]:
+        """Column of ``wave_length``, None when it is not a whole nm in the tables."""
+        column = int(wave_length) - min_wave_length
+        if column != wave_length - min_wave_length or not 0 <= column < self.wave_lengths.size:
+            return None
+        return column
+
+
+def build_tables() -> LookupTables:
+    wave_lengths = np.arange(min_wave_length, max_wave_length + 1)
+    energy = np.broadcast_to(photon_energy(wave_lengths), (len(materials), wave_lengths.size))
+    kinetic_energy = np.maximum(energy - work_functions[:, None], 0)
+    return LookupTables(
+        wave_lengths,
+        np.ascontiguousarray(energy),
+        kinetic_energy,
+        np.sqrt(2 * kinetic_energy / electron_mass),
+        kinetic_energy / elementary_charge,
+    )
+
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """Save ``array`` as ``.npy`` through a temporary file, a reader never sees half of it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _cache_path(cache_dir: str) -> str:
+    # the name changes with every input of the tables, stale files are never read
+    key = repr((materials, work_functions.tolist(), min_wave_length, max_wave_length, Planck, speed_of_light, elementary_charge, electron_mass))
+    return os.path.join(cache_dir, f"physics_tables_{hashlib.sha1(key.encode()).hexdigest()[:12]}.npy")
+
+
+_tables = None
+
+
+def lookup_tables(cache_dir: Optional[str] = os.path.join(cache_root, "tables")) -> LookupTables:
+    global _tables
+    if _tables is not None:
+        return _tables
+
+    path = _cache_path(cache_dir) if cache_dir else None
+    if path and os.path.exists(path):
+        stacked = np.load(path)
+        _tables = LookupTables(np.arange(min_wave_length, max_wave_length + 1), *stacked)
+        return _tables
+
+    _tables = build_tables()
+    if path:
+        try:
+            save_array(path, np.stack(_tables[1:]))
+        except OSError:
+            # read-only installs, the tables are cheap to build again
+            pass
+    return _tables
@@ -0,0 +1,153 @@
+"""Per-step telemetry of a running simulation.
+
+Samples go to a fixed-size ring buffer, so memory use stays constant however
+long the simulation runs. Optionally the ring lives in shared memory, where
+another process can read the live samples without copies::
+
+    reader = TelemetryReader(name)     # name of the recorder's shared block
+    samples = reader.latest(1000)
+
+and full history can be spilled to a raw file of ``telemetry_dtype`` records,
+written through memory-mapped windows and read back with ``load``.
+"""
+import os
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from .core import Simulation
+
+telemetry_dtype = np.dtype([
+    ("time", np.float64),
+    ("emitted", np.float64),  # real electrons emitted in the step
+    ("collected", np.float64),  # real electrons reaching the anode in the step
+    ("current", np.float64),  # anode current, A
+    ("voltage", np.float64),
+    ("wave_length", np.float64),
+    ("material", np.uint8),  # index into core.materials
+    ("in_flight", np.uint32),  # drawn electrons between the electrodes
+])
+
+# the shared block starts with the number of samples written and the capacity
+header_dtype = np.dtype([("written", np.int64), ("capacity", np.int64)])
+
+
+def _ring_views(buffer, capacity: Optional[int] = None):
+    header = np.ndarray((), dtype=header_dtype, buffer=buffer)
+    if capacity is None:
+        capacity = int(header["capacity"])
+    ring = np.ndarray((capacity,), dtype=telemetry_dtype, buffer=buffer, offset=header_dtype.itemsize)
+    return header, ring
+
+
+def _latest(ring: np.ndarray, written: int, count: Optional[int]) -> np.ndarray:
+    capacity = ring.size
+    available = min(written, capacity)
+    count = available if count is None else min(count, available)
+    indices = np.arange(written - count, written) % capacity
+    return ring[indices]
+
+
+class Telemetry:
+    def __init__(self, capacity: int = 65536, spill_path: Optional[str] = None, spill_chunk: int = 65536, shared: bool = False) -> None:
+        self.capacity = capacity
+
+        self.shm = None
+        if shared:
+            size = header_dtype.itemsize + capacity * telemetry_dtype.itemsize
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.header, self.ring = _ring_views(self.shm.buf, capacity)
+            self.header["capacity"] = capacity
+        else:
+            self.header = np.zeros((), dtype=header_dtype)
+            self.ring = np.zeros(capacity, dtype=telemetry_dtype)
+        self.header["written"] = 0
+        self.written = 0
+
+        self.spill_path = spill_path
+        self.spill_chunk = spill_chunk
+        self.spilled = 0
+        if spill_path is not None:
+            # the spill is flushed before the ring wraps around
+            self.spill_batch = min(spill_chunk, capacity // 2) or 1
+            open(spill_path, "wb").close()
+
+    @property
+    def name(self) -> Optional[str]:
+        """Name of the shared memory block for ``TelemetryReader``."""
+        return self.shm.name if self.shm is not None else None
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def record(self, simulation: Simulation) -> None:
+        sample = self.ring[self.written % self.capacity]
+        sample["time"] = simulation.time
+        sample["emitted"] = simulation.step_emitted
+        sample["collected"] = simulation.step_collected
+        sample["current"] = simulation.anode_current
+        sample["voltage"] = simulation.voltage
+        sample["wave_length"] = simulation.wave_length
+        sample["material"] = simulation.material_index
+        sample["in_flight"] = len(simulation.electrons)
+
+        self.written += 1
+        # readers trust every sample below "written"
+        self.header["written"] = self.written
+
+        if self.spill_path is not None and self.written - self.spilled >= self.spill_batch:
+            self.flush()
+
+    def latest(self, count: Optional[int] = None) -> np.ndarray:
+        """Copy of the last ``count`` samples, oldest first."""
+        return _latest(self.ring, self.written, count)
+
+    def flush(self) -> None:
+        if self.spill_path is None or self.spilled == self.written:
+            return
+        samples = _latest(self.ring, self.written, self.written - self.spilled)
+
+        itemsize = telemetry_dtype.itemsize
+        with open(self.spill_path, "r+b") as f:
+            f.truncate((self.spilled + samples.size) * itemsize)
+        for start in range(0, samples.size, self.spill_chunk):
+            window = samples[start:start + self.spill_chunk]
+            spill = np.memmap(self.spill_path, dtype=telemetry_dtype, mode="r+", offset=(self.spilled + start) * itemsize, shape=window.shape)
+            spill[:] = window
+            spill.flush()
+            del spill
+        self.spilled += samples.size
+
+    def close(self) -> None:
+        self.flush()
+        if self.shm is not None:
+            del self.header, self.ring
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class TelemetryReader:
+    """Read-only view of the ring of a ``Telemetry(shared=True)`` in another process."""
+    def __init__(self, name: str) -> None:
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.header, self.ring = _ring_views(self.shm.buf)
+
+    @property
+    def written(self) -> int:
+        return int(self.header["written"])
+
+    def latest(self, count: Optional[int] = None) -> np.ndarray:
+        return _latest(self.ring, self.written, count)
+
+    def close(self) -> None:
+        del self.header, self.ring
+        self.shm.close()
+
+
+def load(path: str) -> np.ndarray:
+    """Memory-maps a spill file written by ``Telemetry``."""
+    if not os.path.getsize(path):
+        return np.zeros(0, dtype=telemetry_dtype)
+    return np.memmap(path, dtype=telemetry_dtype, mode="r")
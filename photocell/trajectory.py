@@ -0,0 +1,179 @@
+"""Closed-form electron trajectories driven by exit events.
+
+The field between the electrodes is uniform, so an electron launched at
+``t0`` from ``x0`` with velocity ``v0`` is at ``x0 + v0*t + a/2*t**2`` after
+``t`` seconds. ``AnalyticElectrons`` stores only these launch parameters,
+positions are evaluated when they are drawn. Hitting the anode, turning
+around and falling back to the catode are scheduled in a heap when the
+electron is launched, so a step only pops the events that are due, however
+long the step is.
+
+``AnalyticElectrons`` has the interface of ``core.Electrons`` and is passed to
+``Simulation(electrons=AnalyticElectrons())``.
+"""
+import heapq
+from typing import Tuple
+
+import numpy as np
+
+from .core import electron_size, electrons_per_display, field_acceleration, launch_x, space_between_electrodes
+
+ANODE, CATODE, TURN = 0, 1, 2
+
+
+def crossing_time(d: np.ndarray, v0: np.ndarray, a: float) -> np.ndarray:
+    """First time a motion from 0 with ``v0`` and ``a`` reaches ``d``, inf if never."""
+    disc = v0*v0 + 2*a*d
+    root = np.sqrt(np.maximum(disc, 0))
+    # 2d / (v0 ± root) is the stable form of (-v0 ± root) / a, and also
+    # holds when a == 0
+    denominator = np.where(d > 0, v0 + root, v0 - root)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = 2*d / denominator
+    return np.where((disc >= 0) & (t >= 0) & np.isfinite(t), t, np.inf)
+
+
+class AnalyticElectrons:
+    def __init__(self, space: Tuple[int, int, int, int] = space_between_electrodes, capacity: int = 4096) -> None:
+        self.space = tuple(space)
+        self.size = electron_size
+
+        left, top, width, height = self.space
+        self.anode_x = left + width
+        self.catode_x = left - self.size[0]
+
+        self.t0 = np.zeros(capacity, dtype=np.float64)
+        self.x0 = np.zeros(capacity, dtype=np.float64)
+        self.v0 = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.int64)
+        self.weight = np.zeros(capacity, dtype=np.float64)
+        self.generation = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        self.time = 0.0
+        self.voltage = None
+        self.acceleration = 0.0
+        self.events = []
+        self.turned = 0
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.alive))
+
+    @property
+    def capacity(self) -> int:
+        return self.alive.size
+
+    def grow(self, capacity: int) -> None:
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        for name in ("t0", "x0", "v0", "y", "weight", "generation", "alive"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate((array, np.zeros(extra, dtype=array.dtype))))
+
+    @property
+    def x(self) -> np.ndarray:
+        t = self.time - self.t0
+        return np.floor(self.x0 + self.v0*t + 0.5*self.acceleration*t*t).astype(np.int64)
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self.v0 + self.acceleration*(self.time - self.t0)
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        slots = np.flatnonzero(self.alive)
+        t = self.time - self.t0[slots]
+        x = self.x0[slots] + self.v0[slots]*t + 0.5*self.acceleration*t*t
+        return np.floor(x).astype(np.int64), self.y[slots]
+
+    def spawn(self, velocity: np.ndarray, y: np.ndarray, x=launch_x, weight=electrons_per_display) -> np.ndarray:
+        velocity = np.asarray(velocity, dtype=np.float64)
+        count = velocity.size
+        if not count:
+            return np.empty(0, dtype=np.intp)
+
+        free = np.flatnonzero(~self.alive)
+        if free.size < count:
+            self.grow(max(self.capacity * 2, self.capacity + count - free.size))
+            free = np.flatnonzero(~self.alive)
+        slots = free[:count]
+
+        self.t0[slots] = self.time
+        self.x0[slots] = x
+        self.v0[slots] = velocity
+        self.y[slots] = y
+        self.weight[slots] = weight
+        self.generation[slots] += 1
+        self.alive[slots] = True
+
+        for event in self.schedule(slots):
+            heapq.heappush(self.events, event)
+        return slots
+
+    def schedule(self, slots: np.ndarray) -> list:
+        """Next event of each slot, launched at t0 from x0 with v0."""
+        x0, v0, a = self.x0[slots], self.v0[slots], self.acceleration
+        t_anode = crossing_time(self.anode_x - x0, v0, a)
+        t_catode = crossing_time(self.catode_x - x0, v0, a)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_turn = np.where(v0*a < 0, -v0 / a, np.inf)
+
+        t_exit = np.minimum(t_anode, t_catode)
+        kind = np.where(t_anode <= t_catode, ANODE, CATODE)
+        turns = t_turn < t_exit
+        t_next = np.where(turns, t_turn, t_exit) + self.t0[slots]
+        kind = np.where(turns, TURN, kind)
+
+        finite = np.isfinite(t_next)
+        return list(zip(t_next[finite].tolist(), kind[finite].tolist(), slots[finite].tolist(), self.generation[slots[finite]].tolist()))
+
+    def rebase(self) -> None:
+        """Restarts every trajectory from its current state after the field changed."""
+        slots = np.flatnonzero(self.alive)
+        t = self.time - self.t0[slots]
+        self.x0[slots] += self.v0[slots]*t + 0.5*self.acceleration*t*t
+        self.v0[slots] += self.acceleration*t
+        self.t0[slots] = self.time
+        self.generation[slots] += 1
+
+    def clear(self) -> None:
+        self.alive[:] = False
+        self.generation += 1
+        self.events = []
+
+    def step(self, timedelta: float, voltage: float) -> Tuple[float, float]:
+        """Advance to the end of the step, returns the real electrons (collected, returned)."""
+        if voltage != self.voltage:
+            self.rebase()
+            self.voltage = voltage
+            self.acceleration = field_acceleration(voltage)
+            self.events = self.schedule(np.flatnonzero(self.alive))
+            heapq.heapify(self.events)
+
+        self.time += timedelta
+        collected = returned = 0.0
+        events = self.events
+        while events and events[0][0] <= self.time:
+            t, kind, slot, generation = heapq.heappop(events)
+            if generation != self.generation[slot] or not self.alive[slot]:
+                continue
+
+            if kind == TURN:
+                self.turned += 1
+                # launch the way back from the turning point at rest
+                tau = t - self.t0[slot]
+                self.x0[slot] += self.v0[slot]*tau + 0.5*self.acceleration*tau*tau
+                self.v0[slot] = 0.0
+                self.t0[slot] = t
+                self.generation[slot] += 1
+                for event in self.schedule(np.array([slot])):
+                    heapq.heappush(events, event)
+                continue
+
+            self.alive[slot] = False
+            if kind == ANODE:
+                collected += self.weight[slot]
+            else:
+                returned += self.weight[slot]
+
+        return float(collected), float(returned)
@@ -0,0 +1,196 @@
+"""Physics on a worker thread.
+
+``PhysicsWorker`` steps a ``Simulation`` on its own thread and publishes
+``Snapshot``s of the electron positions and the readouts through
+``Snapshots``: of three buffers the worker fills one that is neither the
+published one nor the one the render thread holds, so a snapshot the render
+thread acquired is never refilled while it draws, however fast the worker
+publishes. Neither thread takes a lock, only references are swapped.
+
+Parameter changes go the other way through a command queue, which the worker
+drains before each step. ``SimulationProxy`` puts both behind the attribute
+interface of ``Simulation``, so the pygame views work with either one.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+
+from .core import Simulation, max_wavelength_of_materials, work_function_of_materials
+from .scheduler import Scheduler
+
+parameters = ("light_performance", "wave_length", "voltage", "catode_mat", "electrons_per_display", "spectrum")
+
+
+class Snapshot:
+    __slots__ = ("sequence", "time", "x", "y", "current", "anode_current", "collected", "in_flight")
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self.sequence = -1
+        self.time = 0.0
+        self.x = np.zeros(capacity, dtype=np.int64)
+        self.y = np.zeros(capacity, dtype=np.int64)
+        self.current = 0.0
+        self.anode_current = 0.0
+        self.collected = 0.0
+        self.in_flight = 0
+
+    def __len__(self) -> int:
+        return self.in_flight
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.x[:self.in_flight], self.y[:self.in_flight]
+
+    def fill(self, simulation: Simulation, sequence: int) -> None:
+        x, y = simulation.electrons.positions()
+        if x.size > self.x.size:
+            self.x = np.zeros(x.size * 2, dtype=np.int64)
+            self.y = np.zeros(x.size * 2, dtype=np.int64)
+        self.x[:x.size] = x
+        self.y[:y.size] = y
+        self.in_flight = x.size
+
+        self.time = simulation.time
+        self.current = simulation.current
+        self.anode_current = simulation.anode_current
+        self.collected = simulation.collected
+        self.sequence = sequence
+
+
+class Snapshots:
+    """Hands snapshots from a producer thread to the render thread."""
+    def __init__(self) -> None:
+        self.buffers = (Snapshot(), Snapshot(), Snapshot())
+        self.latest = self.buffers[0]
+        self.held = None
+
+    def back(self) -> Snapshot:
+        """Buffer for the producer to fill, neither published nor held."""
+        latest, held = self.latest, self.held
+        return next(b for b in self.buffers if b is not latest and b is not held)
+
+    def publish(self, snapshot: Snapshot) -> None:
+        self.latest = snapshot
+
+    def acquire(self) -> Snapshot:
+        """Latest snapshot, it stays unchanged until the next acquire."""
+        while True:
+            snapshot = self.latest
+            self.held = snapshot
+            # the producer may have picked the snapshot for refilling before
+            # it saw it held, then it has published a newer one meanwhile
+            if self.latest is snapshot:
+                return snapshot
+
+
+class PhysicsWorker(threading.Thread):
+    def __init__(self, simulation: Simulation, scheduler: Scheduler, on_step: Optional[Callable[[Simulation], Any]] = None) -> None:
+        super().__init__(name="physics", daemon=True)
+        self.simulation = simulation
+        self.scheduler = scheduler
+        self.on_step = on_step
+
+        self.commands = queue.SimpleQueue()
+        self.snapshots = Snapshots()
+        self.published = 0
+        self.snapshots.latest.fill(simulation, 0)
+
+        self.running = threading.Event()
+
+    def set(self, name: str, value: Any) -> None:
+        self.commands.put((name, value))
+
+    def stop(self) -> None:
+        self.running.clear()
+        self.join()
+
+    def start(self) -> None:
+        self.running.set()
+        super().start()
+
+    def run(self) -> None:
+        simulation = self.simulation
+        scheduler = self.scheduler
+        while self.running.is_set():
+            while True:
+                try:
+                    name, value = self.commands.get_nowait()
+                except queue.Empty:
+                    break
+                setattr(simulation, name, value)
+
+            steps = scheduler.substeps()
+            for i in range(steps):
+                simulation.step(scheduler.timedelta)
+                if self.on_step is not None:
+                    self.on_step(simulation)
+
+            if steps:
+                self.published += 1
+                back = self.snapshots.back()
+                back.fill(simulation, self.published)
+                self.snapshots.publish(back)
+
+            time.sleep(0.5 / scheduler.physics_rate)
+
+
+class _SnapshotElectrons:
+    def __init__(self, worker: PhysicsWorker) -> None:
+        self.worker = worker
+
+    def __len__(self) -> int:
+        return len(self.worker.snapshots.latest)
+
+    def positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        # valid until the next call, views the render thread draws one frame from
+        return self.worker.snapshots.acquire().positions()
+
+
+class SimulationProxy:
+    """Stands in for the Simulation of a worker on the render thread.
+
+    Parameters read back the last value set here, setting one queues a
+    command for the worker. Readouts and electrons come from the latest
+    snapshot.
+    """
+    def __init__(self, worker: PhysicsWorker) -> None:
+        self.__dict__["worker"] = worker
+        self.__dict__["values"] = {name: getattr(worker.simulation, name) for name in parameters}
+        self.__dict__["electrons"] = _SnapshotElectrons(worker)
+
+    def __getattr__(self, name: str) -> Any:
+        values = self.__dict__["values"]
+        if name in values:
+            return values[name]
+        if name in ("current", "anode_current", "collected", "time"):
+            return getattr(self.worker.snapshots.latest, name)
+        if name == "work_function":
+            return work_function_of_materials[values["catode_mat"]]
+        if name == "max_wavelength":
+            return max_wavelength_of_materials[values["catode_mat"]]
+        raise AttributeError(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name not in parameters:
+            raise AttributeError(f"{name} can not be set through the worker")
+        self.values[name] = value
+        self.worker.set(name, value)
+
+    def sync(self) -> bool:
+        """Takes over parameters changed on the worker's side, returns whether any changed."""
+        changed = False
+        for name in parameters:
+            value = getattr(self.worker.simulation, name)
+            if self.values[name] != value:
+                self.values[name] = value
+                changed = True
+        return changed
+
+    def refresh_catode(self) -> None:
+        pass
+
+    def step(self, timedelta: float) -> int:
+        # the worker steps the simulation
+        return 0
@@ -0,0 +1,275 @@
+"""Offline rendering of a scripted run to image files or a video encoder.
+
+The simulation runs deterministically in this process, its parameters follow
+a keyframe timeline. The frames are drawn with the ``Photocell`` and
+``Settings`` views in a process pool, without a display, and written in
+order::
+
+    python render.py lecture.json -o frames/frame_%06d.png
+    python render.py lecture.json --encoder "ffmpeg -y -f rawvideo -pix_fmt rgb24 -s 1000x800 -r 60 -i - lecture.mp4"
+
+The timeline is a JSON list of keyframes. Light (%), wavelength (nm) and
+voltage (mV) are interpolated linearly between keyframes, the material
+changes at its keyframe, a value missing from a keyframe is carried over::
+
+    [{"time": 0, "catode_mat": "Cs", "wave_length": 650, "light": 50, "voltage": 5},
+     {"time": 20, "wave_length": 300},
+     {"time": 30, "catode_mat": "K"}]
+
+Output files ending in ``.raw`` get the bare RGB bytes of the frame, other
+suffixes are saved by ``pygame.image.save``.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import collections
+import json
+import multiprocessing
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pygame as pg
+
+import sprites
+from photocell.core import Simulation, materials
+from photocell.scheduler import Scheduler
+from photocell.trajectory import AnalyticElectrons
+from photocell.worker import Snapshot
+
+size = (1000, 800)
+defaults = {"catode_mat": "Al", "wave_length": 515, "light": 50, "voltage": 5.05}
+# the ranges of the sliders, wavelength in nm, light in percent and voltage in mV
+ranges = {"wave_length": (280, 750), "light": (0, 100), "voltage": (0.1, 10)}
+
+# parameters of one frame, the current and the electron positions
+Frame = Tuple[int, Dict[str, Any], float, np.ndarray, np.ndarray]
+
+
+class Timeline:
+    def __init__(self, keyframes: List[Dict[str, Any]]) -> None:
+        if not isinstance(keyframes, list) or not keyframes:
+            raise ValueError("the timeline needs a list of at least one keyframe")
+        for keyframe in keyframes:
+            if not isinstance(keyframe, dict):
+                raise ValueError(f"keyframe {keyframe!r} is not an object")
+            second = keyframe.get("time", 0)
+            if isinstance(second, bool) or not isinstance(second, (int, float)) or not (np.isfinite(second) and second >= 0):
+                raise ValueError(f"time {second!r} of a keyframe is not a number of seconds from 0")
+        keyframes = sorted(keyframes, key=lambda k: k.get("time", 0))
+
+        self.times = np.array([k.get("time", 0) for k in keyframes], dtype=np.float64)
+        self.values = {}
+        for name, default in defaults.items():
+            value = default
+            column = []
+            for k in keyframes:
+                value = k.get(name, value)
+                column.append(value)
+            self.values[name] = column
+
+        unknown = {repr(m) for m in self.values["catode_mat"] if m not in materials}
+        if unknown:
+            raise ValueError(f"unknown materials in the timeline: {', '.join(sorted(unknown))}")
+        for name, (low, high) in ranges.items():
+            for second, value in zip(self.times, self.values[name]):
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+                    raise ValueError(f"{name} {value!r} at {second:g} s is not within {low:g}-{high:g}")
+
+    @classmethod
+    def load(cls, path: str) -> "Timeline":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1])
+
+    def at(self, t: float) -> Dict[str, Any]:
+        """Simulation parameters at ``t`` seconds of the video."""
+        i = max(int(np.searchsorted(self.times, t, side="right")) - 1, 0)
+        light, wave_length, voltage = (np.interp(t, self.times, self.values[name]) for name in ("light", "wave_length", "voltage"))
+        return {
+            "light_performance": float(light) / 100 * 5e19,
+            "wave_length": int(round(float(wave_length))),
+            "voltage": round(float(voltage), 2) * 1e-3,
+            "catode_mat": self.values["catode_mat"][i],
+        }
+
+
+def simulate(timeline: Timeline, fps: float, frames: int, seed: int = 0, time_acceleration: float = 1.0) -> Iterator[Frame]:
+    """Runs the simulation like the frame loop of ``main`` at a fixed frame rate."""
+    scheduler = Scheduler(max_fps=None, time_acceleration=time_acceleration)
+    simulation = Simulation(seed=seed, electrons=AnalyticElectrons())
+    steps_per_frame = scheduler.physics_rate * scheduler.time_acceleration / fps
+    owed = 0.0
+
+    for index in range(frames):
+        parameters = timeline.at(index / fps)
+        for name, value in parameters.items():
+            if getattr(simulation, name) != value:
+                setattr(simulation, name, value)
+
+        owed += steps_per_frame
+        steps = int(owed)
+        owed -= steps
+        for i in range(steps):
+            simulation.step(scheduler.timedelta)
+
+        x, y = simulation.electrons.positions()
+        yield index, parameters, simulation.current, x.copy(), y.copy()
+
+
+class FrameRenderer:
+    # the views of main drawn into an off-screen surface, every worker keeps
+    # one, so the dirty rendering only redraws what changed since its last frame
+    def __init__(self) -> None:
+        self.screen = pg.Surface(size)
+        self.screen.fill((255, 255, 255))
+
+        self.simulation = Simulation()
+        self.snapshot = Snapshot()
+        self.photocell = sprites.Photocell(simulation=self.simulation)
+        # a worker only sees every n-th frame, a chart of the current needs all of them
+        self.settings = sprites.Settings(self.photocell, chart=False)
+        self.renderer = sprites.DirtyRenderer(self.screen, self.photocell, self.settings, sprites.ElectronSwarm(self.snapshot))
+        self.renderer.full_redraw()
+
+    def render(self, frame: Frame) -> pg.Surface:
+        index, parameters, current, x, y = frame
+
+        simulation = self.simulation
+        changed = False
+        for name, value in parameters.items():
+            if getattr(simulation, name) != value:
+                setattr(simulation, name, value)
+                changed = True
+        if changed:
+            self.photocell.render_photocell()
+            self.settings.show()
+
+        simulation.current = current
+        snapshot = self.snapshot
+        if x.size > snapshot.x.size:
+            snapshot.x = np.zeros(x.size * 2, dtype=np.int64)
+            snapshot.y = np.zeros(x.size * 2, dtype=np.int64)
+        snapshot.x[:x.size] = x
+        snapshot.y[:y.size] = y
+        snapshot.in_flight = x.size
+
+        self.photocell.render_current()
+        self.photocell.render_voltage()
+        self.renderer.draw()
+        return self.screen
+
+
+_renderer = None
+_output = None
+
+
+def _init_worker(output: Optional[str]) -> None:
+    global _renderer, _output
+    _renderer = FrameRenderer()
+    _output = output
+
+
+def _render_frame(frame: Frame) -> Optional[bytes]:
+    screen = _renderer.render(frame)
+    if _output is None:
+        return pg.image.tostring(screen, "RGB")
+
+    path = _output % frame[0]
+    if path.endswith(".raw"):
+        with open(path, "wb") as f:
+            f.write(pg.image.tostring(screen, "RGB"))
+    else:
+        pg.image.save(screen, path)
+    return None
+
+
+def render(timeline: Timeline, fps: float = 60, duration: Optional[float] = None, seed: int = 0, time_acceleration: float = 1.0, output: Optional[str] = None, sink=None, workers: Optional[int] = None) -> int:
+    """Renders the timeline to the files ``output % frame`` or writes the RGB frames to ``sink``.
+
+    Returns the number of frames.
+    """
+    if duration is None:
+        duration = timeline.duration
+    frames = max(int(round(duration * fps)), 1)
+    if output is not None:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    # spawned, not forked: forked workers share the file offsets of the fonts
+    # sprites opened on import and garble each other's glyphs
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, context, initializer=_init_worker, initargs=(output,)) as executor:
+        # a bounded window of frames in flight, the simulation runs ahead of
+        # the workers without holding the whole video in memory
+        pending = collections.deque()
+        for frame in simulate(timeline, fps, frames, seed, time_acceleration):
+            pending.append(executor.submit(_render_frame, frame))
+            if len(pending) >= workers * 4:
+                _write(pending.popleft().result(), sink)
+        while pending:
+            _write(pending.popleft().result(), sink)
+
+    return frames
+
+
+def _write(data: Optional[bytes], sink) -> None:
+    if data is not None and sink is not None:
+        sink.write(data)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("timeline", help="JSON list of keyframes")
+    parser.add_argument("-o", "--output", default=None, help="file name pattern of the frames, e.g. frames/frame_%%06d.png")
+    parser.add_argument("--encoder", default=None, help="command that reads raw rgb24 frames from its stdin")
+    parser.add_argument("--raw", action="store_true", help="write raw rgb24 frames to stdout")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--duration", type=float, default=None, help="seconds of video, the end of the timeline by default")
+    parser.add_argument("--time-acceleration", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    if sum((args.output is not None, args.encoder is not None, args.raw)) != 1:
+        parser.error("give exactly one of -o, --encoder and --raw")
+
+    try:
+        timeline = Timeline.load(args.timeline)
+    except (OSError, ValueError) as error:
+        parser.error(f"{args.timeline}: {error}")
+    encoder = None
+    sink = None
+    if args.encoder:
+        encoder = subprocess.Popen(shlex.split(args.encoder), stdin=subprocess.PIPE)
+        sink = encoder.stdin
+    elif args.raw:
+        sink = sys.stdout.buffer
+
+    start = time.perf_counter()
+    try:
+        frames = render(timeline, args.fps, args.duration, args.seed, args.time_acceleration, args.output, sink, args.workers)
+    finally:
+        if encoder:
+            encoder.stdin.close()
+            encoder.wait()
+    elapsed = time.perf_counter() - start
+
+    video = frames / args.fps
+    print(f"rendered {frames} frames ({video:.1f} s of video) in {elapsed:.1f} s, {video / elapsed:.2f}x real time", file=sys.stderr)
+    if encoder and encoder.returncode:
+        sys.exit(f"encoder exited with status {encoder.returncode}")
+
+
+if __name__ == "__main__":
+    main()
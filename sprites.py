@@ -1,207 +1,550 @@
 import pygame as pg
+import numpy as np
 import os
-from typing import Any, Tuple, Sequence
-from scipy.constants import speed_of_light, Planck, elementary_charge, pi
-from random import randint
-from math import sqrt, cos
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List, Tuple, Sequence
+from assets import Image, assets
+from photocell import core
+from photocell.light import Spectrum
 
 pg.font.init()
 
 main_dir = os.path.split(os.path.abspath(__file__))[0]
-img_dir = os.path.join(main_dir, 'img')
 font_dir = os.path.join(main_dir, 'fonts')
 font_linlibertine_b = os.path.join(font_dir, 'LinLibertine_RB.ttf')
 font_roboto = os.path.join(font_dir, 'Roboto-Regular.ttf')
-electron_mass = 9.1e-31
-
-spectrum = pg.Surface((471, 5))
-violet = pg.Surface((100, 5))
-violet.fill((127, 0, 255))
-violet_rect = violet.get_rect()
-spectrum.blit(violet, violet_rect)
-visible_path = os.path.join(img_dir, "visible_spectrum.png")
-visible = pg.image.load(visible_path)
-visible = pg.transform.scale(visible, (371, 5))
-visible_rect = visible.get_rect(topleft=(100, 0))
-spectrum.blit(visible, visible_rect)
+
+
+@lru_cache(maxsize=None)
+def spectrum_colors() -> List[Tuple[int]]:
+    # colour of every whole wavelength from 280 nm, spectrum_colors()[wave_length - 280]
+    spectrum = pg.Surface((471, 5))
+    violet = pg.Surface((100, 5))
+    violet.fill((127, 0, 255))
+    violet_rect = violet.get_rect()
+    spectrum.blit(violet, violet_rect)
+    visible = assets.image("visible_spectrum.png", (371, 5))
+    visible_rect = visible.get_rect(topleft=(100, 0))
+    spectrum.blit(visible, visible_rect)
+    return [tuple(spectrum.get_at((x, 1))[:3]) for x in range(spectrum.get_width())]
+
+
+@lru_cache(maxsize=16)
+def light_color(spectrum: Spectrum) -> Tuple[int]:
+    # colours of the spectrum weighted by its photons, as bright as a single wavelength
+    photons = np.interp(np.arange(280, 751), spectrum.wave_lengths, spectrum.photons)
+    color = photons @ np.array(spectrum_colors(), dtype=np.float64)
+    return tuple(int(c) for c in color / color.max() * 255)
+
 
 font_label = pg.font.Font(font_linlibertine_b, 23)
 font_button = pg.font.Font(font_roboto, 20)
 font_slider = pg.font.Font(font_roboto, 15)
 
-class Electron(pg.sprite.Sprite):
-    image = pg.image.load(os.path.join(img_dir, "electron.png"))
-    image = pg.transform.scale(image, (10, 10))
-    def __init__(self, velocity: float, space: pg.Rect) -> None:
-        super().__init__()
 
-        self.velocity = velocity
-        self.space = space
+class LabelCache:
+    # least recently used cache of rendered text, a label is only
+    # rasterized again when its text or colour actually changes
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.labels = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def render(self, font: pg.font.Font, text: str, color: Tuple[int] = (0, 0, 0)) -> pg.Surface:
+        key = (font, text, tuple(color))
+        try:
+            label = self.labels[key]
+        except KeyError:
+            label = self.labels[key] = font.render(text, True, color)
+            if len(self.labels) > self.maxsize:
+                self.labels.popitem(last=False)
+        else:
+            self.labels.move_to_end(key)
+        return label
 
-        start_coords = 234, randint(121, 211)
-        self.rect = self.image.get_rect(topleft=start_coords)
+    def clear(self) -> None:
+        self.labels.clear()
 
-        self.delta_x = 0
 
-    def update(self, timedelta, voltage: float) -> None:
-        self.delta_x += self.velocity*timedelta
-        if int(self.delta_x):
-            self.rect.move_ip(self.delta_x, 0)
-            self.delta_x -= int(self.delta_x)
+label_cache = LabelCache()
 
-        if self.rect.colliderect(self.space):
-            e_field_strength = voltage / 0.1
-            electric_force = e_field_strength * elementary_charge
-            acceleration = electric_force / electron_mass
-            self.velocity += (acceleration*timedelta)
-        else:
-            self.kill()
-        return 
 
-class Photocell(pg.sprite.Sprite):
-    work_function_of_materials = {  # in aJ
-        "Al": 0.68,
-        "Au": 0.77,
-        "As": 0.82,
-        "Ba": 0.42,
-        "Be": 0.71,
-        "Cs": 0.31,
-        "Ce": 0.46,
-        "Eu": 0.4,
-        "Ag": 0.69,
-        "Ga": 0.66,
-        "Ge": 0.78,
-        "Hf": 0.62,
-        "Ca": 0.45,
-        "K": 0.36,
-        "Hg": 0.72,
-        "Pb": 0.66,
-    }
+class HitIndex:
+    # widgets bucketed by the grid cells their rects cover, a click only
+    # tests the few widgets of its own cell instead of every widget
+    def __init__(self, widgets, cell: int = 64) -> None:
+        self.cell = cell
+        self.cells = {}
+        for w in widgets:
+            r = w.rect
+            for cx in range(r.left // cell, (r.right - 1) // cell + 1):
+                for cy in range(r.top // cell, (r.bottom - 1) // cell + 1):
+                    self.cells.setdefault((cx, cy), []).append(w)
 
-    max_wavelength_of_materials = {
-        "Al": 290,
-        "Au": 260,
-        "As": 245,
-        "Ba": 480,
-        "Be": 280,
-        "Cs": 635,
-        "Ce": 435,
-        "Eu": 500,
-        "Ag": 290,
-        "Ga": 300,
-        "Ge": 255,
-        "Hf": 320,
-        "Ca": 440,
-        "K": 550,
-        "Hg": 275,
-        "Pb": 300,
-    }
+    def at(self, pos: Tuple[int]):
+        for w in self.cells.get((pos[0] // self.cell, pos[1] // self.cell), ()):
+            if w.rect.collidepoint(pos):
+                return w
+        return None
 
-    photocell_img = pg.image.load(os.path.join(img_dir, 'photocell.png'))
-    photocell_rect = photocell_img.get_rect()
-    photocell_left_img = pg.image.load(os.path.join(img_dir, 'photocell_left.png'))
-    photocell_left_rect = photocell_left_img.get_rect()
 
-    def __init__(self, light_performance: int = 2.5e19, wave_length: int = 515, voltage: float = 5.05e-3, catode_mat: str = "Al") -> None:
-        super().__init__()        
+def take_dirty_rects(image: pg.Surface, widget: pg.sprite.Sprite) -> List[pg.Rect]:
+    # copies the changed areas of a widget into the image it is drawn on,
+    # returns them in the coordinates of that image
+    rects = []
+    for rect in widget.dirty_rects:
+        area = rect.move(widget.rect.topleft)
+        image.blit(widget.image, area, rect)
+        rects.append(area)
+    widget.dirty_rects = []
+    return rects
 
-        self.catode_mat = catode_mat
-        self.refresh_catode()
-        
-        self.light_performance = light_performance
-        self.wave_length = wave_length
-        self.voltage = voltage
-        self.current = 0
-        self.electron_count = 0
 
-        self.image = pg.Surface((1000, 450))
+def readout_frame(w: int, h: int) -> pg.Surface:
+    frame = pg.Surface((w + 4, h + 4))
+    frame.fill((0, 0, 0))
+    frame.fill((255, 255, 255), pg.Rect(2, 2, w, h))
+    return frame
+
+
+def _simulation_attribute(name: str) -> property:
+    def get(self):
+        return getattr(self.simulation, name)
+
+    def set(self, value):
+        setattr(self.simulation, name, value)
+
+    return property(get, set)
+
+
+class Electron(pg.sprite.Sprite):
+    image = Image("electron.png", (10, 10))
+    def __init__(self, electrons: core.Electrons, slot: int) -> None:
+        super().__init__()
+
+        self.electrons = electrons
+        self.slot = slot
         self.rect = self.image.get_rect()
-        
-        self.render_photocell()
+        self.update()
+
+    @property
+    def velocity(self) -> float:
+        return float(self.electrons.velocity[self.slot])
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        if not self.electrons.alive[self.slot]:
+            self.kill()
+            return
+        self.rect.topleft = int(self.electrons.x[self.slot]), int(self.electrons.y[self.slot])
+
+
+class ElectronSwarm:
+    # draws the electrons of a core.Electrons state, replaces the
+    # pg.sprite.Group of Electron sprites
+    image = Image("electron.png", (10, 10))
+
+    def __init__(self, electrons: core.Electrons) -> None:
+        self.electrons = electrons
+
+    def __len__(self) -> int:
+        return len(self.electrons)
+
+    def sprites(self) -> List[Electron]:
+        return [Electron(self.electrons, slot) for slot in np.flatnonzero(self.electrons.alive)]
+
+    def draw(self, surface: pg.Surface, positions: Tuple[np.ndarray, np.ndarray] = None) -> None:
+        xs, ys = self.electrons.positions() if positions is None else positions
+        image = self.image
+        surface.blits([(image, pos) for pos in zip(xs.tolist(), ys.tolist())], doreturn=False)
+
+    def bounds(self, positions: Tuple[np.ndarray, np.ndarray] = None) -> pg.Rect:
+        xs, ys = self.electrons.positions() if positions is None else positions
+        if not xs.size:
+            return None
+        w, h = self.image.get_size()
+        left, top = int(xs.min()), int(ys.min())
+        return pg.Rect(left, top, int(xs.max()) - left + w, int(ys.max()) - top + h)
+
+
+class PixelSwarm(ElectronSwarm):
+    # writes the electrons straight into the pixels of the space between the
+    # electrodes with numpy, the cost grows with the pixels touched and not
+    # with one blit per electron. "pixels" stamps the electron image, "density"
+    # shades every pixel by the number of electrons covering it, "auto" stamps
+    # up to density_from electrons
+    modes = ("pixels", "density", "auto")
+
+    def __init__(self, electrons: core.Electrons, mode: str = "auto", space: Tuple[int] = core.space_between_electrodes, density_from: int = 20000) -> None:
+        super().__init__(electrons)
+
+        if mode not in self.modes:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {', '.join(self.modes)}")
+        self.mode = mode
+        self.space = pg.Rect(space)
+        self.density_from = density_from
+        self.stamp = None
+
+    def prepare_stamp(self):
+        image = self.image
+        alpha = pg.surfarray.array_alpha(image)
+        ox, oy = np.nonzero(alpha)
+        colors = pg.surfarray.array3d(image)[ox, oy]
+        alphas = alpha[ox, oy]
+        opaque = alphas == 255
+        # colour of a pixel covered by many electrons
+        weights = alphas[:, None] / 255
+        color = (colors * weights).sum(axis=0) / weights.sum()
+        self.stamp = {
+            "opaque": (ox[opaque], oy[opaque], colors[opaque]),
+            "blended": (ox[~opaque], oy[~opaque], colors[~opaque].astype(np.float32), weights[~opaque].astype(np.float32)),
+            "color": color.astype(np.float32),
+        }
 
-    def update(self, timedelta: float, *args: Any, **kwargs: Any) -> None:
-        if self.wave_length < self.max_wavelength:
-            energy_per_photon = Planck * (speed_of_light / (self.wave_length*1e-9))
-            electron_count = (self.light_performance * timedelta) // 1
-            kinetic_energy_per_electron = energy_per_photon - self.work_function*1e-18
+    def draw(self, surface: pg.Surface, positions: Tuple[np.ndarray, np.ndarray] = None) -> None:
+        xs, ys = self.electrons.positions() if positions is None else positions
+        if not xs.size:
+            return
+        if self.stamp is None:
+            self.prepare_stamp()
+
+        clip = self.space.clip(surface.get_rect())
+        pixels = pg.surfarray.pixels3d(surface.subsurface(clip))
+        xs = xs - clip.left
+        ys = ys - clip.top
+        w, h = self.image.get_size()
+        visible = (xs > -w) & (xs < clip.width) & (ys > -h) & (ys < clip.height)
+        xs, ys = xs[visible], ys[visible]
+        if self.mode == "density" or (self.mode == "auto" and xs.size > self.density_from):
+            self.draw_density(pixels, xs, ys)
         else:
-            electron_count = 0
+            self.draw_stamps(pixels, xs, ys)
+        del pixels
+
+    def draw_stamps(self, pixels: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> None:
+        w, h = pixels.shape[:2]
+        sw, sh = self.image.get_size()
+
+        # a contiguous copy with a margin of one electron on every side, so
+        # the stamps are written through flat indices without clipping
+        height = h + 2*sh
+        work = np.zeros((w + 2*sw, height, 3), dtype=np.uint8)
+        work[sw:sw + w, sh:sh + h] = pixels
+        flat = work.reshape(-1, 3)
+        corners = (xs + sw) * height + (ys + sh)
+
+        # the blended edge is mixed with the background, overlapping
+        # electrons are not blended over each other
+        ox, oy, colors, weights = self.stamp["blended"]
+        if ox.size:
+            index = (corners[:, None] + (ox * height + oy)).ravel()
+            background = flat[index].astype(np.float32).reshape(xs.size, ox.size, 3)
+            flat[index] = (background + (colors - background) * weights).reshape(-1, 3)
+
+        ox, oy, colors = self.stamp["opaque"]
+        index = (corners[:, None] + (ox * height + oy)).ravel()
+        flat[index] = np.broadcast_to(colors, (xs.size,) + colors.shape).reshape(-1, 3)
+
+        pixels[...] = work[sw:sw + w, sh:sh + h]
+
+    def draw_density(self, pixels: np.ndarray, xs: np.ndarray, ys: np.ndarray, strength: float = 0.35) -> None:
+        color = self.stamp["color"]
+        w, h = pixels.shape[:2]
+        sw, sh = self.image.get_size()
+
+        # electrons counted at their top left corner, on a grid reaching
+        # one electron size beyond the left and top edge
+        gx, gy = xs + sw, ys + sh
+        inside = (gx >= 0) & (gx < w + sw) & (gy >= 0) & (gy < h + sh)
+        counts = np.bincount(gx[inside] * (h + sh) + gy[inside], minlength=(w + sw) * (h + sh)).reshape(w + sw, h + sh)
+
+        # box sum over the electron size, the number of electrons covering each pixel
+        summed = np.zeros((w + sw + 1, h + sh + 1), dtype=np.int64)
+        summed[1:, 1:] = counts.cumsum(axis=0).cumsum(axis=1)
+        density = summed[sw + 1:w + sw + 1, sh + 1:h + sh + 1] - summed[1:w + 1, sh + 1:h + sh + 1] - summed[sw + 1:w + sw + 1, 1:h + 1] + summed[1:w + 1, 1:h + 1]
+
+        covered = density > 0
+        alpha = (1 - np.exp(-strength * density[covered]))[:, None]
+        background = pixels[covered].astype(np.float32)
+        pixels[covered] = background + (color - background) * alpha
+
+
+class DirtyRenderer:
+    # redraws only the changed regions of the screen: the readouts and the
+    # background marked in photocell.dirty_rects, the area covered by the
+    # electrons now and in the previous frame, and the settings panel when
+    # settings.dirty is set or only its settings.dirty_rects
+    def __init__(self, screen: pg.Surface, photocell: "Photocell", settings: "Settings", electron_group: ElectronSwarm) -> None:
+        self.screen = screen
+        self.photocell = photocell
+        self.settings = settings
+        self.electron_group = electron_group
+
+        self.electron_bounds = None
+
+    def full_redraw(self) -> List[pg.Rect]:
+        self.photocell.dirty_rects = [self.photocell.rect.copy()]
+        self.settings.dirty = True
+        return self.draw()
+
+    def draw(self) -> List[pg.Rect]:
+        screen = self.screen
+        photocell = self.photocell
+        dirty = []
+
+        for rect in photocell.dirty_rects:
+            screen_rect = rect.move(photocell.rect.topleft)
+            screen.blit(photocell.image, screen_rect, rect)
+            dirty.append(screen_rect)
+        photocell.dirty_rects = []
+
+        # one read of the positions, the restored area and the drawn electrons
+        # come from the same snapshot
+        positions = self.electron_group.electrons.positions()
+        bounds = self.electron_group.bounds(positions)
+        if bounds is not None:
+            bounds.move_ip(photocell.rect.topleft)
+        region = bounds
+        if self.electron_bounds is not None:
+            region = self.electron_bounds if region is None else region.union(self.electron_bounds)
+        self.electron_bounds = bounds
+
+        if region is not None:
+            region = region.clip(screen.get_rect())
+            screen.blit(photocell.image, region, region.move(-photocell.rect.left, -photocell.rect.top))
+            self.electron_group.draw(screen, positions)
+            dirty.append(region)
+
+        settings = self.settings
+        if settings.dirty:
+            screen.blit(settings.image, settings.rect)
+            dirty.append(settings.rect)
+            settings.dirty = False
+        else:
+            for rect in settings.dirty_rects:
+                screen_rect = rect.move(settings.rect.topleft)
+                screen.blit(settings.image, screen_rect, rect)
+                dirty.append(screen_rect)
+        settings.dirty_rects = []
 
-        self.current = (electron_count * elementary_charge) / timedelta
-        self.electron_count += electron_count
+        return dirty
 
-        electrons = []
-        electrons_to_display = int(self.electron_count/5e14)
-        for i in range(electrons_to_display):
-            velocity = sqrt((2 * kinetic_energy_per_electron) / electron_mass)
-            degree = randint(0, 85)
-            radian = (degree/360) * 2*pi
-            velocity_x = velocity * cos(radian)
 
-            electron = Electron(velocity_x, self.space_between_electrodes)
-            electrons.append(electron)
+class ProfilerOverlay(pg.sprite.Sprite):
+    def __init__(self, topleft: Tuple[int] = (5, 5), refresh_every: int = 15) -> None:
+        super().__init__()
 
-            self.electron_count -= 5e14
+        self.image = pg.Surface((230, 170))
+        self.rect = self.image.get_rect(topleft=topleft)
+        self.refresh_every = refresh_every
+        self.frames = 0
 
-        return electrons
+    def render(self, profiler) -> None:
+        self.frames += 1
+        if self.frames % self.refresh_every != 1:
+            return
 
-    def render_current(self):
-        # w: 110, h: 45
-        widget = pg.Surface((114, 49))
-        widget.fill((0, 0, 0))
-        widget.set_clip(pg.Rect(2, 2, 110, 45))
-        widget.fill((255, 255, 255))
-        widget_r = widget.get_rect()
+        self.image.fill((0, 0, 0))
+        self.image.fill((255, 255, 230), self.image.get_rect().inflate(-4, -4))
 
-        current_to_render = round(self.current, 2)
-        text = font_label.render(f"I = {current_to_render} A", True, (0, 0, 0))
-        textpos = text.get_rect(center=widget_r.center)
+        p = profiler.percentiles()
+        lines = [f"frame p50 {p[50]:.2f}  p95 {p[95]:.2f}  p99 {p[99]:.2f} ms"]
+        lines += [f"{name:10} {ms:7.3f} ms" for name, ms in profiler.breakdown().items()]
+        lines += [f"{name} {value:g}" for name, value in profiler.counters().items()]
 
-        widget_r.move_ip(440, 305)
+        y = 6
+        for line in lines:
+            text = label_cache.render(font_slider, line)
+            self.image.blit(text, (8, y))
+            y += text.get_height()
 
-        widget.blit(text, textpos)
-        self.image.blit(widget, widget_r)
 
-    def render_voltage(self):
-        widget = pg.Surface((134, 49))
-        widget.fill((0, 0, 0))
-        widget.set_clip(pg.Rect(2, 2, 130, 45))
-        widget.fill((255, 255, 255))
-        widget_r = widget.get_rect()
+class Photocell(pg.sprite.Sprite):
+    work_function_of_materials = core.work_function_of_materials
+    max_wavelength_of_materials = core.max_wavelength_of_materials
 
-        voltage_to_render = self.voltage * 1000
-        text = font_label.render(f"U = {voltage_to_render} mV", True, (0, 0, 0))
-        textpos = text.get_rect(center=widget_r.center)
+    photocell_img = Image('photocell.png')
+    photocell_left_img = Image('photocell_left.png')
 
-        widget_r.move_ip(150, 305)
+    # w: 110, h: 45 and w: 130, h: 45 inside a 2 px border
+    readout_frames = {
+        "current": readout_frame(110, 45),
+        "voltage": readout_frame(130, 45),
+    }
+
+    # the light ray is rotated once, render_background only tints it
+    lightray_mask = pg.Surface((330, 45), pg.SRCALPHA)
+    lightray_mask.fill((255, 255, 255, 255))
+    lightray_mask = pg.transform.rotate(lightray_mask, 21)
+    lightray_rect = lightray_mask.get_rect(center=(368, 116))
+
+    # composited backgrounds keyed by (ray colour, ray transparency)
+    backgrounds = OrderedDict()
+    max_backgrounds = 16
+
+    def __init__(self, light_performance: int = 2.5e19, wave_length: int = 515, voltage: float = 5.05e-3, catode_mat: str = "Al", simulation: core.Simulation = None) -> None:
+        super().__init__()
+
+        if simulation is None:
+            simulation = core.Simulation(light_performance, wave_length, voltage, catode_mat)
+        self.simulation = simulation
 
-        widget.blit(text, textpos)
-        self.image.blit(widget, widget_r)
-        
-    def render_photocell(self):
         self.image = pg.Surface((1000, 450))
         self.rect = self.image.get_rect()
+        self.dirty_rects = []
 
         # space between electrodes
         # 233, 121 -- topleft
         # 740, 218 -- bottomright
-        self.space_between_electrodes = pg.Rect(233, 121, 497, 100)
+        self.space_between_electrodes = pg.Rect(core.space_between_electrodes)
+
+        self.render_photocell()
+
+    light_performance = _simulation_attribute("light_performance")
+    wave_length = _simulation_attribute("wave_length")
+    voltage = _simulation_attribute("voltage")
+    catode_mat = _simulation_attribute("catode_mat")
+    current = _simulation_attribute("current")
+    work_function = _simulation_attribute("work_function")
+    max_wavelength = _simulation_attribute("max_wavelength")
+    spectrum = _simulation_attribute("spectrum")
+
+    @property
+    def electrons(self) -> core.Electrons:
+        return self.simulation.electrons
+
+    def update(self, timedelta: float, *args: Any, **kwargs: Any) -> int:
+        return self.simulation.step(timedelta)
+
+    def render_current(self):
+        current_to_render = round(self.current, 2)
+        self.render_readout("current", (440, 305), f"I = {current_to_render} A")
+
+    def render_voltage(self):
+        voltage_to_render = self.voltage * 1000
+        self.render_readout("voltage", (150, 305), f"U = {voltage_to_render} mV")
 
-        color_coord = (self.wave_length - 280, 1)
-        lightray_color = spectrum.get_at(color_coord)[:3]
+    def render_readout(self, name: str, topleft: Tuple[int], txt: str):
+        if self.readout_texts.get(name) == txt:
+            return
+        self.readout_texts[name] = txt
+
+        widget = self.readout_frames[name]
+        widget_r = widget.get_rect(topleft=topleft)
+        text = label_cache.render(font_label, txt)
+        textpos = text.get_rect(center=widget_r.center)
+
+        self.image.blit(widget, widget_r)
+        self.image.set_clip(widget_r.inflate(-4, -4))
+        self.image.blit(text, textpos)
+        self.image.set_clip(None)
+        self.dirty_rects.append(widget_r)
+
+    def render_photocell(self):
+        self.rect = self.image.get_rect()
+        self.dirty_rects = [self.rect.copy()]
+        self.readout_texts = {}
+
+        if self.spectrum is None:
+            lightray_color = spectrum_colors()[self.wave_length - 280]
+        else:
+            lightray_color = light_color(self.spectrum)
         lightray_transparency = int((self.light_performance / 5e19) * 255)
-        lightray = pg.Surface((330, 45), pg.SRCALPHA)
-        lightray.fill((*lightray_color, lightray_transparency))
-        self.lightray = pg.transform.rotate(lightray, 21)
-        self.lightray_rect = self.lightray.get_rect(center=(368, 116))
+        key = (lightray_color, lightray_transparency)
+
+        try:
+            background = self.backgrounds[key]
+        except KeyError:
+            background = self.backgrounds[key] = self.render_background(lightray_color, lightray_transparency)
+            if len(self.backgrounds) > self.max_backgrounds:
+                self.backgrounds.popitem(last=False)
+        else:
+            self.backgrounds.move_to_end(key)
+
+        self.image.blit(background, self.rect)
 
-        self.image.blit(self.photocell_img, self.photocell_rect)
-        self.image.blit(self.lightray, self.lightray_rect)
-        self.image.blit(self.photocell_left_img, self.photocell_left_rect)
+    def render_background(self, lightray_color: Tuple[int], lightray_transparency: int) -> pg.Surface:
+        background = pg.Surface((1000, 450))
+
+        self.lightray = self.lightray_mask.copy()
+        self.lightray.fill((*lightray_color, lightray_transparency), special_flags=pg.BLEND_RGBA_MULT)
+
+        background.blit(self.photocell_img, (0, 0))
+        background.blit(self.lightray, self.lightray_rect)
+        background.blit(self.photocell_left_img, (0, 0))
+        return background
 
     def refresh_catode(self):
-        self.work_function = self.work_function_of_materials[self.catode_mat]
-        self.max_wavelength = self.max_wavelength_of_materials[self.catode_mat]
+        self.simulation.refresh_catode()
+
+class CellPanel(pg.sprite.Sprite):
+    # one photocell of the comparison grid, scaled down with a caption below
+    caption_h = 30
+
+    def __init__(self, simulation: core.Simulation, rect: pg.Rect) -> None:
+        super().__init__()
+
+        self.photocell = Photocell(simulation=simulation)
+        self.rect = rect
+        self.image = pg.Surface(rect.size)
+        self.image.fill((255, 255, 255))
+
+        self.scale = min(rect.width / self.photocell.rect.width, (rect.height - self.caption_h) / self.photocell.rect.height)
+        self.cell_size = (int(self.photocell.rect.width * self.scale), int(self.photocell.rect.height * self.scale))
+        self.cell_image = pg.Surface(self.cell_size)
+
+    def render(self) -> None:
+        photocell = self.photocell
+        photocell.render_current()
+        photocell.render_voltage()
+        if photocell.dirty_rects:
+            pg.transform.scale(photocell.image, self.cell_size, self.cell_image)
+            self.image.blit(self.cell_image, (0, 0))
+            photocell.dirty_rects = []
+
+            caption_rect = pg.Rect(0, self.cell_size[1], self.rect.width, self.caption_h)
+            self.image.fill((255, 255, 255), caption_rect)
+            caption = f"{photocell.catode_mat}   {photocell.wave_length} nm   {round(photocell.voltage * 1000, 2)} mV"
+            text = label_cache.render(font_button, caption)
+            self.image.blit(text, text.get_rect(center=caption_rect.center))
+
+
+class ComparisonView:
+    # draws the cells of a photocell.scene.Scene in a grid, the electrons of
+    # all cells are drawn with one blits call
+    def __init__(self, scene, size: Tuple[int] = (1000, 800), columns: int = None) -> None:
+        self.scene = scene
+        count = len(scene)
+        if columns is None:
+            columns = min(count, 3)
+        rows = -(-count // columns)
+        cell_w = size[0] // columns
+        cell_h = min(size[1] // rows, cell_w * 450 // 1000 + CellPanel.caption_h)
+
+        self.panels = []
+        for i, simulation in enumerate(scene.cells):
+            rect = pg.Rect((i % columns) * cell_w, (i // columns) * cell_h, cell_w, cell_h)
+            self.panels.append(CellPanel(simulation, rect))
+
+        scale = self.panels[0].scale
+        self.scale = scale
+        self.origins = np.array([p.rect.topleft for p in self.panels])
+        size = max(1, int(Electron.image.get_width() * scale)), max(1, int(Electron.image.get_height() * scale))
+        self.electron_image = pg.transform.scale(Electron.image, size)
+
+    def draw(self, surface: pg.Surface) -> None:
+        for panel in self.panels:
+            panel.render()
+            surface.blit(panel.image, panel.rect)
+
+        cell, x, y = self.scene.positions()
+        xs = (self.origins[cell, 0] + x * self.scale).astype(int).tolist()
+        ys = (self.origins[cell, 1] + y * self.scale).astype(int).tolist()
+        image = self.electron_image
+        surface.blits([(image, pos) for pos in zip(xs, ys)], doreturn=False)
+
 
 class MenuButton(pg.sprite.Sprite):
     def __init__(self, parent: pg.sprite.Sprite, name: str, txt: str):
@@ -261,6 +604,8 @@ class Menu(pg.sprite.Sprite):
                 widget.rect.center = x, row_h * i
                 self.image.blit(widget.image, widget.rect)
 
+        self.hits = HitIndex(self.buttons)
+
     def change_active(self, to: MenuButton):
         self.active.render_inactive()
         to.render_active()
@@ -269,15 +614,13 @@ class Menu(pg.sprite.Sprite):
         self.arrange()
 
     def clicked(self, pos: Tuple[int]):
-        for b in self.buttons:
-            if b.rect.collidepoint(pos):
-                self.change_active(b)
+        b = self.hits.at(pos)
+        if b:
+            self.change_active(b)
 
 
 class Slider(pg.sprite.Sprite):
-    cursor_path = os.path.join(img_dir, 'slider_cursor.png')
-    cursor_img = pg.image.load(cursor_path)
-    cursor_img = pg.transform.scale(cursor_img, (8, 64))
+    cursor_img = Image('slider_cursor.png', (8, 64))
 
     def __init__(self, scale_img: pg.Surface, min_value: float, max_value: float, unit: str, accuracy: int = 0) -> None:
         super().__init__()
@@ -311,14 +654,14 @@ class Slider(pg.sprite.Sprite):
         self.min_display_img = pg.Surface((limit_display_w, limit_display_h))
         self.min_display_img.fill((255, 255, 255))
         self.min_display_rect = self.min_display_img.get_rect(center=(int(limit_display_w/2), self.scale_rect.centery))
-        text = font_slider.render(f"{self.min_value} {self.unit}", True, (0, 0, 0))
+        text = label_cache.render(font_slider, f"{self.min_value} {self.unit}")
         textpos = text.get_rect(center=self.min_display_img.get_rect().center)
         self.min_display_img.blit(text, textpos)
 
         self.max_display_img = pg.Surface((limit_display_w, limit_display_h))
         self.max_display_img.fill((255, 255, 255))
         self.max_display_rect = self.max_display_img.get_rect(center=(int(limit_display_w/2) + limit_display_w + self.scale_rect.width, self.scale_rect.centery))
-        text = font_slider.render(f"{self.max_value} {self.unit}", True, (0, 0, 0))
+        text = label_cache.render(font_slider, f"{self.max_value} {self.unit}")
         textpos = text.get_rect(center=self.max_display_img.get_rect().center)
         self.max_display_img.blit(text, textpos)
 
@@ -331,7 +674,7 @@ class Slider(pg.sprite.Sprite):
         self.actual_display_img = pg.Surface((60, actual_display_h))
         self.actual_display_img.fill((255, 255, 255))
         self.actual_display_rect = self.actual_display_img.get_rect(center=(self.image.get_rect().centerx, actual_display_h/2))    
-        text = font_slider.render(f"{self.actual_value} {self.unit}", True, (0, 0, 0))
+        text = label_cache.render(font_slider, f"{self.actual_value} {self.unit}")
         textpos = text.get_rect(center=self.actual_display_img.get_rect().center)
         self.actual_display_img.blit(text, textpos)
 
@@ -343,6 +686,17 @@ class Slider(pg.sprite.Sprite):
         self.image.blit(self.actual_display_img, self.actual_display_rect)
         self.image.blit(self.cursor_img, self.cursor_rect)
 
+    def set_value(self, value: float):
+        position_percentage = min(max((value - self.min_value) / self.interval, 0), 1)
+        mouse_newx = int(round(self.mouse_interval[0] + (self.mouse_interval[1] - self.mouse_interval[0])*position_percentage))
+
+        if self.accuracy == 0:
+            self.actual_value = int(round(value, 0))
+        else:
+            self.actual_value = round(value, self.accuracy)
+
+        self.render_pos(mousepos=(mouse_newx, self.scale_vert_center))
+
     def handle_input(self, pos: Tuple[int], type: str):
         pos_x = pos[0] - self.rect.topleft[0]
         pos_y = pos[1] - self.rect.topleft[1]
@@ -369,7 +723,8 @@ class Slider(pg.sprite.Sprite):
             else:
                 self.actual_value = round(new_value, self.accuracy)
 
-            self.render_pos(mousepos=(mouse_newx, self.scale_vert_center))
+            if mouse_newx != self.cursor_rect.centerx or type == "stop":
+                self.render_pos(mousepos=(mouse_newx, self.scale_vert_center))
 
             if type == "stop":
                 self.ongoing_input = False
@@ -389,8 +744,7 @@ class LightSettings(pg.sprite.Sprite):
         self.image = self.parent.image.copy()
         self.rect = self.image.get_rect()
 
-        scale_img_path = os.path.join(img_dir, "scale_line.png")
-        scale_img = pg.image.load(scale_img_path)
+        scale_img = assets.image("scale_line.png", (350, 50))
 
         self.light_intensity_slider = Slider(scale_img, 0, 100, "%")
         self.wavelength_slider = Slider(scale_img, 280, 750, "nm")
@@ -400,6 +754,7 @@ class LightSettings(pg.sprite.Sprite):
         self.arrange()
 
         self.listening_to_event = None
+        self.dirty_rects = []
 
     def arrange(self):
         row_h = int(self.rect.height / len(self.widgets))
@@ -413,38 +768,59 @@ class LightSettings(pg.sprite.Sprite):
             w.rect.center = column_x, row_y
             self.image.blit(w.image, w.rect)
 
+        self.hits = HitIndex(self.widgets)
+
     def refresh(self):
         [self.image.blit(w.image, w.rect) for w in self.widgets]
 
+    def show(self):
+        self.light_intensity_slider.set_value(self.photocell.light_performance / 5e19 * 100)
+        self.wavelength_slider.set_value(self.photocell.wave_length)
+        self.voltage_slider.set_value(self.photocell.voltage * 1000)
+        self.refresh()
+
     def handle_input(self, pos: Tuple[int], type: str):
         pos_x = pos[0] - self.rect.topleft[0]
         pos_y = pos[1] - self.rect.topleft[1]
         pos = pos_x, pos_y
 
         if type == "start" and not self.listening_to_event:
-            for w in self.widgets:
-                if w.rect.collidepoint(pos):
-                    w.handle_input(pos, type)
-                    if w.ongoing_input:
-                        self.listening_to_event = w
+            w = self.hits.at(pos)
+            if w:
+                w.handle_input(pos, type)
+                if w.ongoing_input:
+                    self.listening_to_event = w
 
         elif self.listening_to_event:
-            w_new_value = self.listening_to_event.handle_input(pos, type)
+            slider = self.listening_to_event
+            cursor_x = slider.cursor_rect.centerx
+            w_new_value = slider.handle_input(pos, type)
 
             if w_new_value:
-                if self.listening_to_event == self.light_intensity_slider:
+                if slider == self.light_intensity_slider:
                     self.photocell.light_performance = (w_new_value/100) * 5e19
-                if self.listening_to_event == self.wavelength_slider:
+                if slider == self.wavelength_slider:
                     self.photocell.wave_length = w_new_value
-                if self.listening_to_event == self.voltage_slider:
+                    # a wavelength picked on the slider replaces the lamp
+                    if self.photocell.spectrum is not None:
+                        self.photocell.spectrum = None
+                if slider == self.voltage_slider:
                     self.photocell.voltage = w_new_value*1e-3
                 
                 self.listening_to_event = None
+                # the parameters only change on release, dragging redraws the slider alone
+                self.photocell.render_photocell()
 
-            self.photocell.render_photocell()
-            self.refresh()
+            if w_new_value:
+                self.refresh()
+                self.parent.refresh()
+                return True
+            if slider.cursor_rect.centerx != cursor_x:
+                # a drag only redraws the slider
+                self.image.blit(slider.image, slider.rect)
+                self.dirty_rects.append(slider.rect.copy())
 
-        self.parent.refresh()
+        return False
 
 
 class MaterialButton(pg.sprite.Sprite):
@@ -496,6 +872,7 @@ class MaterialSelector(pg.sprite.Sprite):
         self.arrange()
 
         self.mouse_start = None
+        self.dirty_rects = []
 
     def arrange(self):
         sprites = self.buttons.sprites()
@@ -513,15 +890,26 @@ class MaterialSelector(pg.sprite.Sprite):
                 widget.rect.center = rect.center
                 self.image.blit(widget.image, widget.rect)
 
+        self.hits = HitIndex(self.buttons)
+
     def change_active(self, to: MaterialButton):
+        self.highlight(to)
+
+        self.photocell.catode_mat = self.active.name
+        self.photocell.refresh_catode()
+
+    def highlight(self, to: MaterialButton):
         self.active.render_inactive()
         to.render_active()
         self.active = to
 
         self.arrange()
 
-        self.photocell.catode_mat = self.active.name
-        self.photocell.refresh_catode()
+    def show(self):
+        # only the buttons follow, the material is already set
+        for b in self.buttons:
+            if b.name == self.photocell.catode_mat and b is not self.active:
+                self.highlight(b)
 
     def handle_input(self, pos: Tuple[int], type: str):
         pos_x = pos[0] - self.rect.topleft[0]
@@ -532,11 +920,13 @@ class MaterialSelector(pg.sprite.Sprite):
             self.mouse_start = pos
 
         if type == "stop":
-            for b in self.buttons:
-                if b.rect.collidepoint(self.mouse_start):
-                    self.change_active(b)
+            b = self.hits.at(self.mouse_start)
+            if b:
+                self.change_active(b)
+                self.parent.refresh()
+                return True
 
-            self.parent.refresh()
+        return False
 
 
 class Canvas(pg.sprite.Sprite):
@@ -551,6 +941,7 @@ class Canvas(pg.sprite.Sprite):
             "catode": MaterialSelector(self, photocell)
         }
         self.active = self.states[active]
+        self.dirty_rects = []
         self.refresh()
 
     def change_active(self, to: str):
@@ -566,18 +957,218 @@ class Canvas(pg.sprite.Sprite):
         pos_y = pos[1] - self.rect.topleft[1]
         pos = pos_x, pos_y
 
-        self.active.handle_input(pos, type)
+        changed = self.active.handle_input(pos, type)
+        self.dirty_rects += take_dirty_rects(self.image, self.active)
+        return changed
+
+
+class CurrentChart(pg.sprite.Sprite):
+    # current collected by the anode over time and over the voltage, drawn one
+    # column at a time: the time plot scrolls by a column and draws only the
+    # new one, every column shows the minimum and maximum of the current in it.
+    # A drawn electron carries the charge of many real ones, so the current is
+    # averaged over time_constant for the time plot and over the whole time
+    # spent at a voltage for the characteristic
+    voltage_range = (0.1e-3, 10e-3)  # of the voltage slider
+    trace_color = (0, 0, 180)
+    old_trace_color = (160, 160, 160)
+
+    def __init__(self, photocell: Photocell, topleft: Tuple[int] = (0, 0), size: Tuple[int] = (300, 130), seconds_per_column: float = 2e-6, time_constant: float = 4e-5) -> None:
+        super().__init__()
+
+        self.photocell = photocell
+        self.image = pg.Surface(size)
+        self.rect = self.image.get_rect(topleft=topleft)
+        self.seconds_per_column = seconds_per_column  # simulated seconds
+        self.time_constant = time_constant
+
+        half = size[0] // 2
+        self.time_plot = pg.Rect(40, 24, half - 50, size[1] - 44)
+        self.iv_plot = self.time_plot.move(half, 0)
+
+        columns = self.time_plot.width
+        self.history = np.full((2, columns), np.nan)  # lowest and highest current of every column
+        # charge collected and time spent at the voltage of every column
+        self.iv_charge = np.zeros(columns)
+        self.iv_time = np.zeros(columns)
+        self.iv_rows = np.full(columns, -1)  # drawn height of the mean
+        self.column_end = None
+        self.iv_column = None
+        self.conditions = None
+        self.last = None  # time and collected charge of the last frame
+        self.average = 0.0
+        self.scale = 1.0
+
+        self.redraw()
+
+    def iv_means(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.iv_time > 0, self.iv_charge / self.iv_time, np.nan)
+
+    def row(self, plot: pg.Rect, current: float) -> int:
+        return plot.bottom - 1 - int(current * (plot.height - 1) / self.scale)
+
+    def redraw(self) -> pg.Rect:
+        self.image.fill((255, 255, 255))
+
+        time_span = self.time_plot.width * self.seconds_per_column * 1e6
+        for plot, title, left, right in ((self.time_plot, "I (t)", f"-{time_span:g} µs", "0"),
+                                         (self.iv_plot, "I (U)", f"{self.voltage_range[0] * 1000:g}", f"{self.voltage_range[1] * 1000:g} mV")):
+            self.image.blit(label_cache.render(font_slider, title), (plot.left - 30, 2))
+            pg.draw.lines(self.image, (0, 0, 0), False, ((plot.left - 1, plot.top), (plot.left - 1, plot.bottom), plot.bottomright))
+
+            top = label_cache.render(font_slider, f"{self.scale:g} A")
+            self.image.blit(top, top.get_rect(topright=(plot.left - 3, plot.top - 4)))
+            zero = label_cache.render(font_slider, "0")
+            self.image.blit(zero, zero.get_rect(bottomright=(plot.left - 3, plot.bottom + 4)))
+
+            below = label_cache.render(font_slider, left)
+            self.image.blit(below, below.get_rect(topleft=(plot.left, plot.bottom + 2)))
+            below = label_cache.render(font_slider, right)
+            self.image.blit(below, below.get_rect(topright=(plot.right, plot.bottom + 2)))
+
+        means = self.iv_means()
+        for i in range(self.time_plot.width):
+            self.draw_column(self.time_plot, i, *self.history[:, i], self.trace_color)
+            color = self.trace_color if i == self.iv_column else self.old_trace_color
+            self.draw_column(self.iv_plot, i, means[i], means[i], color)
+            self.iv_rows[i] = -1 if np.isnan(means[i]) else self.row(self.iv_plot, means[i])
+        return self.image.get_rect()
+
+    def draw_column(self, plot: pg.Rect, i: int, low: float, high: float, color: Tuple[int]) -> None:
+        x = plot.left + i
+        self.image.fill((255, 255, 255), (x, plot.top, 1, plot.height))
+        if np.isnan(low):
+            return
+        # at least 3 px tall, a steady current is still visible
+        y0 = max(self.row(plot, high) - 1, plot.top)
+        y1 = min(self.row(plot, low) + 1, plot.bottom - 1)
+        self.image.fill(color, (x, y0, 1, y1 - y0 + 1))
+
+    def render(self) -> List[pg.Rect]:
+        """Adds the current of this frame, returns the changed areas of the image."""
+        photocell = self.photocell
+        simulation = photocell.simulation
+        time = simulation.time
+        charge = simulation.collected * core.elementary_charge
+        columns = self.time_plot.width
+        redraw = False
+
+        # the characteristic only holds for one light and catode
+        conditions = (photocell.light_performance, photocell.wave_length, photocell.spectrum, photocell.catode_mat)
+        if conditions != self.conditions:
+            self.conditions = conditions
+            self.iv_charge[:] = 0
+            self.iv_time[:] = 0
+            self.iv_column = None
+            redraw = True
+
+        passed = 0
+        if self.column_end is None or time < self.column_end - self.seconds_per_column:
+            # the first frame or a simulation started over
+            self.column_end = time + self.seconds_per_column
+            self.history[:] = np.nan
+            self.last = None
+            self.average = 0.0
+            redraw = True
+        elif time >= self.column_end:
+            passed = int((time - self.column_end) // self.seconds_per_column) + 1
+            self.column_end += passed * self.seconds_per_column
+            passed = min(passed, columns)
+            self.history = np.roll(self.history, -passed, axis=1)
+            self.history[:, -passed:] = np.nan
+
+        low, high = self.voltage_range
+        column = int(round((photocell.voltage - low) / (high - low) * (columns - 1)))
+        column = min(max(column, 0), columns - 1)
+        previous, self.iv_column = self.iv_column, column
+
+        time_changed = False
+        if self.last is not None and time > self.last[0]:
+            timedelta = time - self.last[0]
+            collected = charge - self.last[1]
+            self.average += -np.expm1(-timedelta / self.time_constant) * (collected / timedelta - self.average)
+            time_changed = self.extend(self.history, columns - 1, self.average)
+            self.iv_charge[column] += collected
+            self.iv_time[column] += timedelta
+        self.last = time, charge
+
+        mean = self.iv_charge[column] / self.iv_time[column] if self.iv_time[column] > 0 else np.nan
+        if passed:
+            scale = self.fitting_scale()
+        elif max(self.average, mean) > self.scale:
+            scale = _nice_ceiling(max(self.average, mean))
+        else:
+            scale = self.scale
+        if scale != self.scale:
+            self.scale = scale
+            redraw = True
+        if redraw:
+            return [self.redraw()]
+
+        dirty = []
+        if passed:
+            self.image.set_clip(self.time_plot)
+            self.image.scroll(-passed)
+            self.image.set_clip(None)
+            for i in range(columns - passed, columns):
+                self.draw_column(self.time_plot, i, *self.history[:, i], self.trace_color)
+            dirty.append(self.time_plot.copy())
+        elif time_changed:
+            self.draw_column(self.time_plot, columns - 1, *self.history[:, -1], self.trace_color)
+            dirty.append(pg.Rect(self.time_plot.right - 1, self.time_plot.top, 1, self.time_plot.height))
+
+        if previous is not None and previous != column:
+            previous_mean = self.iv_means()[previous]
+            self.draw_column(self.iv_plot, previous, previous_mean, previous_mean, self.old_trace_color)
+            dirty.append(pg.Rect(self.iv_plot.left + previous, self.iv_plot.top, 1, self.iv_plot.height))
+        row = -1 if np.isnan(mean) else self.row(self.iv_plot, mean)
+        if row != self.iv_rows[column] or previous != column:
+            self.iv_rows[column] = row
+            self.draw_column(self.iv_plot, column, mean, mean, self.trace_color)
+            dirty.append(pg.Rect(self.iv_plot.left + column, self.iv_plot.top, 1, self.iv_plot.height))
+        return dirty
+
+    def fitting_scale(self) -> float:
+        # grows with the current and shrinks when the traces fell far below the top
+        values = np.concatenate((self.history[1], self.iv_means()))
+        values = values[~np.isnan(values)]
+        top = float(values.max()) if values.size else 0.0
+        if top <= 0:
+            return self.scale
+        scale = _nice_ceiling(top)
+        if scale > self.scale or scale < self.scale / 2:
+            return scale
+        return self.scale
+
+    @staticmethod
+    def extend(extents: np.ndarray, i: int, current: float) -> bool:
+        low, high = extents[:, i]
+        if low <= current <= high:
+            return False
+        extents[0, i] = current if np.isnan(low) else min(low, current)
+        extents[1, i] = current if np.isnan(high) else max(high, current)
+        return True
+
+
+def _nice_ceiling(value: float) -> float:
+    # the smallest 1, 2 or 5 times a power of ten that is at least value
+    exponent = 10.0 ** np.floor(np.log10(value))
+    for mantissa in (1, 2, 5, 10):
+        if mantissa * exponent >= value:
+            return float(mantissa * exponent)
 
 
 class Settings(pg.sprite.Sprite):
-    def __init__(self, photocell) -> None:
+    def __init__(self, photocell, chart: bool = True) -> None:
         super().__init__()
 
         self.image = pg.Surface((1000, 350))
         self.image.fill((255, 255, 255))
         self.rect = self.image.get_rect(topleft=(0, 450))
 
-        menu_img = pg.Surface((300, 350))
+        # the chart of the current sits below the menu buttons
+        menu_img = pg.Surface((300, 220 if chart else 350))
         menu_img.fill((255, 255, 255))
         light_button = MenuButton(self, "light", "Light and Voltage")
         catode_button = MenuButton(self, "catode", "Catode Material")
@@ -588,34 +1179,63 @@ class Settings(pg.sprite.Sprite):
         canvas_pos = (300, 0)
         self.canvas = Canvas(canvas_img, photocell, canvas_pos, self.menu.active.name)
 
+        self.chart = CurrentChart(photocell, (0, 220)) if chart else None
+        self.dirty_rects = []
+
         self.refresh_settings()
 
         self.mouse_start = None
 
     def refresh_settings(self):
+        self.dirty = True
         self.image.blit(self.menu.image, self.menu.rect)
         self.image.blit(self.canvas.image, self.canvas.rect)
+        self.canvas.dirty_rects = []
+        if self.chart:
+            self.image.blit(self.chart.image, self.chart.rect)
+
+    def render_chart(self):
+        if self.chart is None:
+            return
+        for rect in self.chart.render():
+            settings_rect = rect.move(self.chart.rect.topleft)
+            self.image.blit(self.chart.image, settings_rect, rect)
+            self.dirty_rects.append(settings_rect)
+
+    def show(self):
+        # moves the widgets to the parameters of the photocell, for runs driven without the mouse
+        for state in self.canvas.states.values():
+            state.show()
+        self.canvas.refresh()
+        self.refresh_settings()
 
     def handle_input(self, pos: Tuple[int], type: str):
         pos_x = pos[0] - self.rect.topleft[0]
         pos_y = pos[1] - self.rect.topleft[1]
         pos = pos_x, pos_y
 
+        changed = False
         if type == "mousestart":
             self.mouse_start = pos
 
             if self.canvas.rect.collidepoint(*pos):
-                self.canvas.handle_input(self.mouse_start, 'start')
+                changed = self.canvas.handle_input(self.mouse_start, 'start')
 
         if type == "mousestop":
             if self.menu.rect.collidepoint(*self.mouse_start):
                 self.menu.clicked(self.mouse_start)
                 self.canvas.change_active(self.menu.active.name)
+                changed = True
 
             if self.canvas.rect.collidepoint(*self.mouse_start):
-                self.canvas.handle_input(pos, 'stop')
+                changed = self.canvas.handle_input(pos, 'stop') or changed
 
         if self.canvas.rect.collidepoint(*self.mouse_start) and type == "mousepos":
-            self.canvas.handle_input(pos, 'pos')
+            changed = self.canvas.handle_input(pos, 'pos')
 
-        self.refresh_settings()
\ No newline at end of file
+        # only widgets that actually changed are blitted again, a dragged
+        # slider goes to the screen on its own
+        if changed:
+            self.refresh_settings()
+        else:
+            self.dirty_rects += take_dirty_rects(self.image, self.canvas)
\ No newline at end of file
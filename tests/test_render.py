@@ -0,0 +1,33 @@
+import pytest
+
+from render import Timeline
+
+
+@pytest.mark.parametrize("keyframes", [
+    [],
+    {"time": 0},
+    [1],
+    [{"time": "1"}],
+    [{"time": -1}],
+    [{"time": float("nan")}],
+    [{"catode_mat": "Xx"}],
+    [{"catode_mat": ["Cs"]}],
+    [{"wave_length": 900}],
+    [{"time": 0}, {"time": 2, "light": 150}],
+    [{"voltage": 0}],
+    [{"voltage": "5"}],
+])
+def test_bad_timelines_are_rejected(keyframes):
+    with pytest.raises(ValueError):
+        Timeline(keyframes)
+
+
+def test_keyframes_are_interpolated_at_the_slider_ends():
+    timeline = Timeline([
+        {"time": 2, "wave_length": 750, "light": 100, "voltage": 10, "catode_mat": "Cs"},
+        {"time": 0, "wave_length": 280, "light": 0, "voltage": 0.1},
+    ])
+    assert timeline.duration == 2
+    assert timeline.at(0) == {"light_performance": 0.0, "wave_length": 280, "voltage": 0.1e-3, "catode_mat": "Al"}
+    assert timeline.at(1)["wave_length"] == 515
+    assert timeline.at(2)["catode_mat"] == "Cs"
@@ -0,0 +1,55 @@
+from photocell.replay import Recorder, Replay, new_simulation
+
+
+def record(path, seed=3, frames=120):
+    clock = iter(range(10**6)).__next__
+    recorder = Recorder(str(path), seed, 1e-6, clock=clock)
+    simulation = new_simulation(seed, analytic=True)
+    for frame in range(frames):
+        if frame == 30:
+            simulation.catode_mat = "Cs"
+        if frame == 60:
+            simulation.wave_length = 400
+            simulation.voltage = 2e-3
+        recorder.input("mousepos", (frame, 2 * frame))
+        steps = 10 + frame % 7
+        recorder.frame(simulation, steps)
+        for i in range(steps):
+            simulation.step(1e-6)
+    recorder.close(simulation)
+    return simulation
+
+
+def test_replay_reproduces_the_recorded_state(tmp_path):
+    path = tmp_path / "run.log"
+    recorded = record(path)
+    assert recorded.collected > 0
+
+    replay = Replay(str(path), snapshot_every=25)
+    inputs = []
+    simulation, index = replay.run(handle_input=lambda pos, type: inputs.append((pos, type)))
+
+    assert replay.frames == 120
+    assert inputs[-1] == ((119, 238), "mousepos")
+    assert replay.verify(simulation)
+    assert simulation.collected == recorded.collected
+
+
+def test_seek_matches_a_full_replay(tmp_path):
+    path = tmp_path / "run.log"
+    record(path)
+    replay = Replay(str(path), snapshot_every=25)
+    replay.run()
+
+    simulation, index = replay.seek(80)
+    simulation, index = replay.run(simulation=simulation, index=index)
+    assert replay.verify(simulation)
+
+
+def test_changed_state_does_not_verify(tmp_path):
+    path = tmp_path / "run.log"
+    record(path)
+    replay = Replay(str(path))
+    simulation, index = replay.run()
+    simulation.step(1e-6)
+    assert not replay.verify(simulation)
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from photocell.core import Simulation
+from photocell.scheduler import Scheduler
+from photocell.server import DELTA, KEY, Connection, FrameDecoder, FrameEncoder, Server
+from photocell.trajectory import AnalyticElectrons
+
+
+def assert_decoded(decoder, simulation):
+    electrons = simulation.electrons
+    x, y = electrons.positions()
+    np.testing.assert_array_equal(decoder.slots, np.flatnonzero(electrons.alive))
+    np.testing.assert_array_equal(decoder.x, x)
+    np.testing.assert_array_equal(decoder.y, y)
+    assert decoder.collected == simulation.collected
+    assert decoder.parameters["catode_mat"] == simulation.catode_mat
+
+
+def test_deltas_follow_the_simulation():
+    simulation = Simulation(catode_mat="Cs", wave_length=400, seed=0)
+    encoder = FrameEncoder()
+    decoder = FrameDecoder()
+
+    decoder.decode(KEY, memoryview(encoder.encode(simulation).key))
+    for frame in range(200):
+        # electrons leave and new ones are spawned between the frames
+        for i in range(frame % 7):
+            simulation.step(1e-6)
+        encoded = encoder.encode(simulation)
+        decoder.decode(DELTA, memoryview(encoded.delta))
+        assert decoder.sequence == encoded.sequence
+        assert_decoded(decoder, simulation)
+
+    assert simulation.collected > 0
+
+
+def test_reused_slot_moves_to_the_new_electron():
+    simulation = Simulation(seed=0)
+    electrons = simulation.electrons
+    electrons.spawn(np.zeros(3), np.array([300, 310, 320]), x=200)
+    encoder = FrameEncoder()
+    decoder = FrameDecoder()
+    decoder.decode(KEY, memoryview(encoder.encode(simulation).key))
+
+    electrons.alive[1] = False
+    slots = electrons.spawn(np.zeros(2), np.array([400, 410]), x=250)
+    assert 1 in slots
+    decoder.decode(DELTA, memoryview(encoder.encode(simulation).delta))
+    assert_decoded(decoder, simulation)
+
+
+def test_key_frame_resynchronises_a_client():
+    simulation = Simulation(catode_mat="Cs", wave_length=400, seed=0)
+    encoder = FrameEncoder()
+    decoder = FrameDecoder()
+    for i in range(50):
+        simulation.step(1e-6)
+        encoded = encoder.encode(simulation)
+    # the client missed the earlier frames
+    decoder.decode(KEY, memoryview(encoded.key))
+    assert_decoded(decoder, simulation)
+
+
+@pytest.fixture
+def port():
+    simulation = Simulation(catode_mat="Cs", wave_length=400, seed=0, electrons=AnalyticElectrons())
+    server = Server(simulation, Scheduler(max_fps=200))
+    started = threading.Event()
+    serving = {}
+
+    async def serve():
+        listening = await asyncio.start_server(server.connect, "localhost", 0)
+        serving.update(loop=asyncio.get_running_loop(), task=asyncio.current_task(), port=listening.sockets[0].getsockname()[1])
+        started.set()
+        async with listening:
+            await server.run()
+
+    def run():
+        # asyncio.run also cancels the handlers of connections still closing
+        try:
+            asyncio.run(serve())
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+    yield serving["port"]
+    serving["loop"].call_soon_threadsafe(serving["task"].cancel)
+    thread.join()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_viewer_joining_late_keeps_receiving(port):
+    first = Connection("localhost", port)
+    first.start()
+    assert wait_for(lambda: first.decoder.sequence >= 30)
+
+    late = Connection("localhost", port)
+    late.start()
+    joined = late.decoder.sequence
+    assert joined >= 30
+    assert wait_for(lambda: late.decoder.sequence >= joined + 30)
+    assert wait_for(lambda: first.decoder.sequence >= joined + 30)
+
+    late.set("catode_mat", "K")
+    assert wait_for(lambda: first.simulation.catode_mat == "K")
+    late.stop()
+    first.stop()
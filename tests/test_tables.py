@@ -0,0 +1,15 @@
+import pytest
+
+from photocell.tables import max_wavelength_of_materials, threshold_wave_length, work_function_of_materials
+
+
+@pytest.mark.parametrize("material, wave_length", [("Al", 292), ("Ag", 288)])
+def test_threshold_is_derived_from_the_work_function(material, wave_length):
+    assert max_wavelength_of_materials[material] == pytest.approx(wave_length, abs=0.5)
+
+
+def test_every_material_has_a_threshold():
+    assert set(max_wavelength_of_materials) == set(work_function_of_materials)
+    # a lower work function frees electrons with longer wavelengths
+    assert max_wavelength_of_materials["Cs"] > max_wavelength_of_materials["Al"]
+    assert threshold_wave_length(work_function_of_materials["Cs"] * 1e-18) == pytest.approx(max_wavelength_of_materials["Cs"])
@@ -0,0 +1,33 @@
+import pytest
+
+from photocell.core import Simulation
+from photocell.trajectory import AnalyticElectrons
+
+
+def run(electrons, steps=3000, **parameters):
+    simulation = Simulation(seed=1, electrons=electrons, **parameters)
+    for i in range(steps):
+        simulation.step(1e-6)
+    return simulation
+
+
+@pytest.mark.parametrize("material, wave_length, voltage", [
+    ("Cs", 400, 5.05e-3),
+    ("Al", 280, 5.05e-3),
+    ("K", 300, 1e-3),
+    ("Cs", 280, 10e-3),
+])
+def test_analytic_electrons_collect_like_euler_steps(material, wave_length, voltage):
+    euler = run(None, catode_mat=material, wave_length=wave_length, voltage=voltage)
+    analytic = run(AnalyticElectrons(), catode_mat=material, wave_length=wave_length, voltage=voltage)
+
+    assert euler.collected > 0
+    assert analytic.emitted == euler.emitted
+    assert analytic.collected == pytest.approx(euler.collected, rel=0.01)
+    assert analytic.returned == pytest.approx(euler.returned, rel=0.01)
+
+
+def test_no_electrons_above_the_threshold():
+    simulation = run(AnalyticElectrons(), steps=500, catode_mat="Al", wave_length=400)
+    assert simulation.emitted == 0
+    assert simulation.collected == 0